@@ -0,0 +1,26 @@
+"""
+ASGI config for Website project.
+
+Serves the GraphQL subscription WebSocket endpoint, while regular HTTP
+traffic keeps going through the WSGI application in config/wsgi.py.
+Run it with an ASGI server, e.g.::
+
+    daphne config.asgi:application
+
+"""
+import os
+import sys
+
+import django
+from channels.routing import get_default_application
+
+# This allows easy placement of apps within the interior
+# website directory.
+app_path = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+)
+sys.path.append(os.path.join(app_path, "website"))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.production")
+
+django.setup()
+application = get_default_application()
@@ -1,5 +1,6 @@
 import os
 from celery import Celery
+from celery.signals import worker_process_init
 
 # set the default Django settings module for the 'celery' program.
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
@@ -14,3 +15,12 @@ app.config_from_object("django.conf:settings", namespace="CELERY")
 
 # Load task modules from all registered Django app configs.
 app.autodiscover_tasks()
+
+
+@worker_process_init.connect
+def warm_up_email_templates(**kwargs):
+    """Compile the email templates once when a worker process starts instead of on its first emails."""
+    from django.conf import settings
+    from website.core.utils import email_templates
+
+    email_templates.warm_up(settings.EMAIL_TEMPLATE_PREFIXES)
@@ -0,0 +1,13 @@
+from django.urls import path
+
+from channels.auth import AuthMiddlewareStack
+from channels.routing import ProtocolTypeRouter, URLRouter
+
+from website.core.consumers import GraphQLSubscriptionConsumer
+
+
+application = ProtocolTypeRouter({
+    'websocket': AuthMiddlewareStack(URLRouter([
+        path('subscriptions/', GraphQLSubscriptionConsumer),
+    ])),
+})
@@ -10,10 +10,14 @@ class Query(LinkSchema.Query, UserSchema.Query, graphene.ObjectType):
 
 
 class Mutation(LinkSchema.Mutation, UserSchema.Mutation, graphene.ObjectType):
-    token_auth    = graphql_jwt.ObtainJSONWebToken.Field()
+    token_auth    = UserSchema.ObtainJSONWebToken.Field()
     verify_token  = graphql_jwt.Verify.Field()
     refresh_token = graphql_jwt.Refresh.Field()
     pass
 
 
-schema = graphene.Schema(query=Query, mutation=Mutation)
+class Subscription(LinkSchema.Subscription, graphene.ObjectType):
+    pass
+
+
+schema = graphene.Schema(query=Query, mutation=Mutation, subscription=Subscription)
@@ -29,6 +29,10 @@ TIME_ZONE = 'UTC'
 LANGUAGE_CODE = 'en-us'
 # https://docs.djangoproject.com/en/dev/ref/settings/#site-id
 SITE_ID = 1
+# Seconds each process may keep a Site after it was changed by another process.
+SITE_CACHE_TTL = env.int('SITE_CACHE_TTL', default=60)
+# Scheme of the absolute URLs built for the site's domain, e.g. in emails.
+SITE_URL_SCHEME = env('SITE_URL_SCHEME', default='https')
 # https://docs.djangoproject.com/en/dev/ref/settings/#use-i18n
 USE_I18N = True
 # https://docs.djangoproject.com/en/dev/ref/settings/#use-l10n
@@ -43,6 +47,17 @@ LOCALE_PATHS = [ROOT_DIR.path('locale')]
 # https://docs.djangoproject.com/en/dev/ref/settings/#databases
 DATABASES = {'default': env.db('DATABASE_URL')}
 DATABASES['default']['ATOMIC_REQUESTS'] = True
+# An optional streaming replica of the primary, GraphQL queries read from it, see website.core.routers.
+if env('DATABASE_REPLICA_URL', default=None):
+    DATABASES['replica'] = env.db('DATABASE_REPLICA_URL')
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+# https://docs.djangoproject.com/en/dev/ref/settings/#database-routers
+DATABASE_ROUTERS = ['website.core.routers.ReplicaRouter']
+# Seconds the replica may lag behind before reads fall back to the primary, and how often that is checked.
+DATABASE_REPLICA_MAX_LAG = env.float('DATABASE_REPLICA_MAX_LAG', default=5)
+DATABASE_REPLICA_LAG_CHECK_INTERVAL = env.int('DATABASE_REPLICA_LAG_CHECK_INTERVAL', default=5)
+# Seconds a user keeps reading from the primary after a mutation, to see their own writes.
+DATABASE_REPLICA_STICKY_SECONDS = env.int('DATABASE_REPLICA_STICKY_SECONDS', default=10)
 
 # URLS
 # ------------------------------------------------------------------------------
@@ -50,6 +65,8 @@ DATABASES['default']['ATOMIC_REQUESTS'] = True
 ROOT_URLCONF = 'config.urls'
 # https://docs.djangoproject.com/en/dev/ref/settings/#wsgi-application
 WSGI_APPLICATION = 'config.wsgi.application'
+# https://channels.readthedocs.io/en/latest/deploying.html#configuring-the-asgi-application
+ASGI_APPLICATION = 'config.routing.application'
 
 # APPS
 # ------------------------------------------------------------------------------
@@ -62,8 +79,10 @@ DJANGO_APPS = [
     'django.contrib.staticfiles',
     # 'django.contrib.humanize', # Handy template tags
     'django.contrib.admin',
+    'django.contrib.postgres',
 ]
 THIRD_PARTY_APPS = [
+    'channels',
     'graphene_django',
     'crispy_forms',
 #    'rest_framework',
@@ -89,11 +108,15 @@ MIGRATION_MODULES = {'sites': 'website.contrib.sites.migrations'}
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#authentication-backends
 AUTHENTICATION_BACKENDS = [
-    'graphql_jwt.backends.JSONWebTokenBackend',
-    'django.contrib.auth.backends.ModelBackend',
+    'website.users.backends.CachedJSONWebTokenBackend',
+    'website.users.backends.BoundedModelBackend',
 ]
 # https://docs.djangoproject.com/en/dev/ref/settings/#auth-user-model
 AUTH_USER_MODEL = 'users.User'
+# Users resolved from tokens are kept this many seconds in each process, and this many seconds in the shared cache.
+JWT_USER_CACHE_SIZE = env.int('JWT_USER_CACHE_SIZE', default=10000)
+JWT_USER_CACHE_TTL = env.int('JWT_USER_CACHE_TTL', default=10)
+JWT_USER_CACHE_TIMEOUT = env.int('JWT_USER_CACHE_TIMEOUT', default=5 * 60)
 # https://docs.djangoproject.com/en/dev/ref/settings/#login-redirect-url
 LOGIN_REDIRECT_URL = 'users:redirect'
 # https://docs.djangoproject.com/en/dev/ref/settings/#login-url
@@ -104,11 +127,17 @@ LOGIN_URL = 'account_login'
 # https://docs.djangoproject.com/en/dev/ref/settings/#password-hashers
 PASSWORD_HASHERS = [
     # https://docs.djangoproject.com/en/dev/topics/auth/passwords/#using-argon2-with-django
-    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    # Argon2 with the parameters written by `manage.py calibrate_password_hasher`.
+    'website.users.hashers.CalibratedArgon2PasswordHasher',
     'django.contrib.auth.hashers.PBKDF2PasswordHasher',
     'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
     'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
 ]
+# Where calibrate_password_hasher writes the Argon2 parameters, the library defaults are used until it is run.
+PASSWORD_HASHER_PROFILE = env('PASSWORD_HASHER_PROFILE', default=str(ROOT_DIR.path('password_hasher.json')))
+# Passwords hashed at the same time across every worker, further sign ups and logins are turned away.
+PASSWORD_HASHING_CONCURRENCY = env.int('PASSWORD_HASHING_CONCURRENCY', default=8)
+PASSWORD_HASHING_SLOT_TIMEOUT = 60
 # https://docs.djangoproject.com/en/dev/ref/settings/#auth-password-validators
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -212,6 +241,13 @@ EMAIL_BACKEND = env(
 )
 # https://docs.djangoproject.com/en/2.2/ref/settings/#email-timeout
 EMAIL_TIMEOUT = 5
+# Email templates compiled when a Celery worker starts, see website.core.utils.EmailTemplates.
+EMAIL_TEMPLATE_PREFIXES = [
+    'users/emails/new_user_password',
+    'users/emails/no_account',
+]
+# Number of emails rendered and handed to the backend at once by the bulk email tasks.
+EMAIL_BATCH_SIZE = env.int('EMAIL_BATCH_SIZE', default=500)
 
 # ADMIN
 # ------------------------------------------------------------------------------
@@ -269,6 +305,33 @@ CELERY_TASK_TIME_LIMIT = 5 * 60
 CELERY_TASK_SOFT_TIME_LIMIT = 60
 # http://docs.celeryproject.org/en/latest/userguide/configuration.html#beat-scheduler
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+# http://docs.celeryproject.org/en/latest/userguide/configuration.html#beat-schedule
+# The DatabaseScheduler stores these entries as periodic tasks on startup.
+CELERY_BEAT_SCHEDULE = {
+    'rank-hot-links': {
+        'task': 'website.links.tasks.rank_hot_links',
+        'schedule': 5 * 60,
+    },
+    'recheck-links': {
+        'task': 'website.links.tasks.recheck_links',
+        'schedule': 60 * 60,
+    },
+}
+
+
+# Redis
+# ------------------------------------------------------------------------------
+REDIS_URL = env('REDIS_URL', default='redis://redis:6379/0')
+
+# Channels
+# ------------------------------------------------------------------------------
+# https://channels.readthedocs.io/en/latest/topics/channel_layers.html
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'CONFIG': {'hosts': [REDIS_URL]},
+    }
+}
 
 
 # Your stuff...
@@ -280,6 +343,70 @@ ONE_TIME_TOKEN_EXPIRE_DAYS = 1/6
 ONE_TIME_TOKEN_SALT = env('DJANGO_SECRET_KEY', default='TrV6NOqyeXINb5TAQ0TWKCIKiOo1XTTF8EBMhR8lCHWBCFZgtG219zCfdO6Y')
 
 
+# GRAPHQL
+# ------------------------------------------------------------------------------
 GRAPHENE = {
     'SCHEMA': 'config.schema.schema',
 }
+# Default and maximum number of nodes returned by a single connection page.
+GRAPHQL_PAGE_SIZE = env.int('GRAPHQL_PAGE_SIZE', default=20)
+GRAPHQL_MAX_PAGE_SIZE = env.int('GRAPHQL_MAX_PAGE_SIZE', default=100)
+# Hard limit on the number of items returned by the plain (unpaginated) list fields.
+GRAPHQL_MAX_LIST_SIZE = env.int('GRAPHQL_MAX_LIST_SIZE', default=1000)
+# Number of parsed and validated GraphQL documents kept in memory per process.
+GRAPHQL_DOCUMENT_CACHE_SIZE = env.int('GRAPHQL_DOCUMENT_CACHE_SIZE', default=1000)
+# Whether clients may register new persisted queries by sending the query along with its hash.
+GRAPHQL_PERSISTED_QUERIES_REGISTER = env.bool('GRAPHQL_PERSISTED_QUERIES_REGISTER', default=True)
+# Root query fields whose results are cached for anonymous users, with the
+# timeout in seconds and the tags that invalidate them.
+GRAPHQL_RESPONSE_CACHE = {
+    'links': (30, ['links']),
+    'linksConnection': (30, ['links']),
+    'votes': (30, ['votes']),
+}
+# Maximum number of operations in a batched request.
+GRAPHQL_MAX_BATCH_SIZE = env.int('GRAPHQL_MAX_BATCH_SIZE', default=10)
+# Maximum number of links submitted in a single createLinks mutation. It is priced per link, so keep it
+# well below GRAPHQL_MAX_QUERY_COST or a full batch gets rejected as too costly.
+GRAPHQL_MAX_BULK_CREATE_SIZE = env.int('GRAPHQL_MAX_BULK_CREATE_SIZE', default=1000)
+# Operations whose estimated cost exceeds this budget are rejected before execution.
+GRAPHQL_MAX_QUERY_COST = env.int('GRAPHQL_MAX_QUERY_COST', default=5000)
+# Cost of individual fields as 'Type.field', overriding 1 for objects and 0 for scalars.
+GRAPHQL_FIELD_COSTS = {
+    'Query.links': 2,
+    'Query.linksConnection': 2,
+}
+# Fields doing their work once per item of a list argument, their cost is multiplied by its length.
+GRAPHQL_COST_BATCH_ARGUMENTS = {
+    'Mutation.createLinks': 'input',
+}
+# Fraction of GraphQL operations profiled, and the duration above which a profiled operation is logged.
+GRAPHQL_PROFILING_SAMPLE_RATE = env.float('GRAPHQL_PROFILING_SAMPLE_RATE', default=0.01)
+GRAPHQL_PROFILING_SLOW_MS = env.int('GRAPHQL_PROFILING_SLOW_MS', default=500)
+
+# HOT RANKING
+# ------------------------------------------------------------------------------
+# A link has to have ten times the votes of one posted this many seconds later to rank above it.
+HOT_RANKING_DECAY_SECONDS = 45000
+# Only links younger than this are ranked, and at most this many of them.
+HOT_RANKING_WINDOW_DAYS = env.int('HOT_RANKING_WINDOW_DAYS', default=7)
+HOT_RANKING_SIZE = env.int('HOT_RANKING_SIZE', default=10000)
+
+# LINK METADATA
+# ------------------------------------------------------------------------------
+# Pages fetched at the same time by a worker, and the limits of a single fetch in seconds and bytes.
+LINK_UNFURL_CONCURRENCY = env.int('LINK_UNFURL_CONCURRENCY', default=10)
+LINK_UNFURL_TIMEOUT = env.int('LINK_UNFURL_TIMEOUT', default=10)
+LINK_UNFURL_MAX_BYTES = env.int('LINK_UNFURL_MAX_BYTES', default=256 * 1024)
+# Number of links fetched by a single task.
+LINK_UNFURL_BATCH_SIZE = env.int('LINK_UNFURL_BATCH_SIZE', default=100)
+# Seconds a task spends fetching, well within CELERY_TASK_SOFT_TIME_LIMIT. Pages not fetched by then are left
+# for the next recheck.
+LINK_UNFURL_DEADLINE = env.int('LINK_UNFURL_DEADLINE', default=40)
+# Links are fetched again after this many days, at most LINK_UNFURL_RECHECK_SIZE of them per pass.
+LINK_UNFURL_RECHECK_DAYS = env.int('LINK_UNFURL_RECHECK_DAYS', default=7)
+LINK_UNFURL_RECHECK_SIZE = env.int('LINK_UNFURL_RECHECK_SIZE', default=5000)
+# A link is marked dead after this many failed fetches in a row.
+LINK_UNFURL_DEAD_AFTER = env.int('LINK_UNFURL_DEAD_AFTER', default=3)
+# Pages are only fetched from public addresses, plus these networks, e.g. ['10.0.0.0/8'].
+LINK_UNFURL_ALLOWED_NETWORKS = env.list('LINK_UNFURL_ALLOWED_NETWORKS', default=[])
@@ -12,6 +12,7 @@ SECRET_KEY = env(
 )
 # https://docs.djangoproject.com/en/dev/ref/settings/#allowed-hosts
 ALLOWED_HOSTS = ["localhost", "0.0.0.0", "127.0.0.1"]
+SITE_URL_SCHEME = env("SITE_URL_SCHEME", default="http")
 
 # CACHES
 # ------------------------------------------------------------------------------
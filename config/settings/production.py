@@ -22,6 +22,8 @@ ALLOWED_HOSTS = env.list("DJANGO_ALLOWED_HOSTS", default=["tedkleinbergman.websi
 DATABASES["default"] = env.db("DATABASE_URL")  # noqa F405
 DATABASES["default"]["ATOMIC_REQUESTS"] = True  # noqa F405
 DATABASES["default"]["CONN_MAX_AGE"] = env.int("CONN_MAX_AGE", default=60)  # noqa F405
+if "replica" in DATABASES:  # noqa F405
+    DATABASES["replica"]["CONN_MAX_AGE"] = env.int("CONN_MAX_AGE", default=60)  # noqa F405
 
 # CACHES
 # ------------------------------------------------------------------------------
@@ -215,6 +217,11 @@ sentry_sdk.init(
 # Your stuff...
 # ------------------------------------------------------------------------------
 
+# GRAPHQL
+# ------------------------------------------------------------------------------
+# Anyone could fill the persisted query table otherwise, add the queries of the clients through the admin instead.
+GRAPHQL_PERSISTED_QUERIES_REGISTER = env.bool("GRAPHQL_PERSISTED_QUERIES_REGISTER", default=False)
+
 # IN APP PURCHASES
 # ------------------------------------------------------------------------------
 GOOGLE_BUNDLE_ID = env("GOOGLE_BUNDLE_ID", default='')
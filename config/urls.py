@@ -10,7 +10,7 @@ from django.views.decorators.csrf import csrf_exempt
 
 from django_celery_beat.models import PeriodicTask, CrontabSchedule, ClockedSchedule, IntervalSchedule, SolarSchedule
 
-from graphene_django.views import GraphQLView
+from website.core.views import GraphQLView
 
 
 urlpatterns = [
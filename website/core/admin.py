@@ -1,3 +1,11 @@
 from django.contrib import admin
 
-# Register your models here.
+from website.core.models import PersistedQuery
+
+
+@admin.register(PersistedQuery)
+class PersistedQueryAdmin(admin.ModelAdmin):
+
+    list_display = ["sha256", "created_at"]
+    search_fields = ["sha256", "query"]
+    readonly_fields = ["sha256", "created_at", "modified_at"]
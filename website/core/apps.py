@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'website.core'
+
+    def ready(self):
+        import website.core.signals  # noqa F401
@@ -0,0 +1,67 @@
+import hashlib
+from functools import partial
+
+from graphql import parse, print_ast, validate
+from graphql.backend.base import GraphQLDocument
+from graphql.backend.core import GraphQLCoreBackend
+from graphql.execution import ExecutionResult, execute
+from graphql.language import ast
+
+from website.core.cache import LRUCache
+
+
+def query_hash(query):
+    """The SHA-256 hex digest identifying a query document."""
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+def get_operation(document_ast, operation_name=None):
+    """Return the operation of a document that would be executed for `operation_name`."""
+    operations = [
+        definition for definition in document_ast.definitions
+        if isinstance(definition, ast.OperationDefinition)
+    ]
+    if not operation_name:
+        return operations[0] if len(operations) == 1 else None
+    return next((op for op in operations if op.name and op.name.value == operation_name), None)
+
+
+def execute_validated(schema, document_ast, validation_errors, *args, **kwargs):
+    if validation_errors:
+        return ExecutionResult(errors=validation_errors, invalid=True)
+    return execute(schema, document_ast, *args, **kwargs)
+
+
+class CachedDocumentBackend(GraphQLCoreBackend):
+    """
+    A GraphQL backend that parses and validates each distinct query once.
+
+    Documents are kept in an LRU cache keyed by the SHA-256 of the query, so
+    repeated operations skip straight to execution.
+    """
+
+    def __init__(self, maxsize, executor=None):
+        super().__init__(executor=executor)
+        self.documents = LRUCache(maxsize)
+
+    def document_from_string(self, schema, document_string):
+        key = query_hash(document_string)
+        document = self.documents.get(key)
+        if document is None or document.schema is not schema:
+            document = self.build_document(schema, document_string)
+            self.documents.set(key, document)
+        return document
+
+    def build_document(self, schema, document_string):
+        document_ast = parse(document_string)
+        validation_errors = validate(schema, document_ast)
+        document = GraphQLDocument(
+            schema=schema,
+            document_string=document_string,
+            document_ast=document_ast,
+            execute=partial(execute_validated, schema, document_ast, validation_errors, **self.execute_params),
+        )
+        # Identifies the operation regardless of whitespace and comments in the query.
+        document.normalized_hash = query_hash(print_ast(document_ast))
+        document.is_valid = not validation_errors
+        return document
@@ -0,0 +1,81 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+class LRUCache:
+    """
+    A thread safe mapping holding at most `maxsize` entries, evicting the least recently used.
+
+    With a `ttl`, entries also expire that many seconds after they were set.
+    """
+
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires, value = self._data[key]
+            except KeyError:
+                return default
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        sentinel = object()
+        return self.get(key, sentinel) is not sentinel
+
+    def __len__(self):
+        return len(self._data)
+
+
+def tag_versions(tags):
+    """
+    Return the current version of each tag.
+
+    Cache entries that depend on a tag include its version in their key, so
+    bumping the version invalidates all of them at once.
+    """
+    keys = {tag: f'tag-version:{tag}' for tag in tags}
+    versions = cache.get_many(keys.values())
+    missing = {key: uuid.uuid4().hex for key in keys.values() if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[keys[tag]] for tag in tags]
+
+
+def invalidate_tags(*tags):
+    cache.set_many({f'tag-version:{tag}': uuid.uuid4().hex for tag in tags}, timeout=None)
+
+
+def invalidate_tags_on_commit(*tags):
+    """Invalidate `tags` once the current transaction commits."""
+    transaction.on_commit(lambda: invalidate_tags(*tags))
@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+
+from channels.generic.websocket import JsonWebsocketConsumer
+from graphene_django.settings import graphene_settings
+from graphene_django.views import GraphQLView
+from promise import Promise, is_thenable
+from rx import Observable
+from rx.subjects import Subject
+
+from website.core.subscriptions import GROUP
+
+
+class GraphQLSubscriptionConsumer(JsonWebsocketConsumer):
+    """
+    Serves GraphQL subscriptions over the `graphql-ws` WebSocket protocol.
+
+    Every connection joins one channel layer group, so a single published
+    event reaches all subscribers. Events are pushed into an observable that
+    is the root value of the subscription resolvers, which filter and map it.
+    """
+
+    groups = [GROUP]
+
+    def connect(self):
+        self.stream = Subject()
+        self.subscriptions = {}
+        self.contexts = {}
+        self.accept('graphql-ws')
+
+    def disconnect(self, code):
+        for operation_id in list(self.subscriptions):
+            self.stop(operation_id)
+        self.stream.on_completed()
+
+    def receive_json(self, message, **kwargs):
+        message_type = message.get('type')
+        if message_type == 'connection_init':
+            self.send_json({'type': 'connection_ack'})
+        elif message_type == 'start':
+            self.start(message.get('id'), message.get('payload') or {})
+        elif message_type == 'stop':
+            self.stop(message.get('id'))
+        elif message_type == 'connection_terminate':
+            self.close()
+
+    def graphql_event(self, message):
+        # DataLoader caches must not outlive a single event.
+        for context in self.contexts.values():
+            context.loaders = None
+        self.stream.on_next(message['event'])
+
+    def start(self, operation_id, payload):
+        self.stop(operation_id)
+
+        context = SimpleNamespace(user=self.scope.get('user'), loaders=None)
+        result = graphene_settings.SCHEMA.execute(
+            payload.get('query'),
+            root_value=self.stream,
+            context_value=context,
+            variable_values=payload.get('variables'),
+            operation_name=payload.get('operationName'),
+            allow_subscriptions=True,
+        )
+
+        if isinstance(result, Observable):
+            self.contexts[operation_id] = context
+            self.subscriptions[operation_id] = result.subscribe(lambda result: self.send_result(operation_id, result))
+        else:
+            self.send_result(operation_id, result)
+            self.send_json({'type': 'complete', 'id': operation_id})
+
+    def stop(self, operation_id):
+        subscription = self.subscriptions.pop(operation_id, None)
+        self.contexts.pop(operation_id, None)
+        if subscription is not None:
+            subscription.dispose()
+
+    def send_result(self, operation_id, result):
+        data = result.data
+        if is_thenable(data):
+            # Nested fields resolved through DataLoaders.
+            data = Promise.resolve(data).get()
+
+        payload = {'data': data}
+        if result.errors:
+            payload['errors'] = [GraphQLView.format_error(error) for error in result.errors]
+        self.send_json({'type': 'data', 'id': operation_id, 'payload': payload})
@@ -0,0 +1,127 @@
+from django.conf import settings
+
+from graphene import relay
+from graphql.language import ast
+from graphql.type import GraphQLList, GraphQLNonNull
+from graphql.type.definition import get_named_type
+
+from website.core.pagination import page_size
+
+
+def is_list(graphql_type):
+    if isinstance(graphql_type, GraphQLNonNull):
+        graphql_type = graphql_type.of_type
+    return isinstance(graphql_type, GraphQLList)
+
+
+def is_connection(graphql_type):
+    graphene_type = getattr(graphql_type, 'graphene_type', None)
+    return isinstance(graphene_type, type) and issubclass(graphene_type, relay.Connection)
+
+
+class CostAnalyzer:
+    """
+    Estimates the work an operation will cause before it is executed.
+
+    Every field costs its weight from GRAPHQL_FIELD_COSTS, which defaults to 1
+    for fields returning objects and 0 for scalars. The cost of the selections
+    below a list is multiplied by the most items the server may return for
+    it: `first` clamped like the resolvers clamp it, or the page size of a
+    connection and GRAPHQL_MAX_LIST_SIZE of a list when it is missing. The
+    edges of a connection are already counted by the `first` of the connection.
+    Fields in GRAPHQL_COST_BATCH_ARGUMENTS cost their weight once per item of
+    the given list argument, e.g. every link passed to createLinks.
+    """
+
+    def __init__(self, schema, document_ast, variables=None):
+        self.schema = schema
+        self.variables = variables or {}
+        self.fragments = {
+            definition.name.value: definition for definition in document_ast.definitions
+            if isinstance(definition, ast.FragmentDefinition)
+        }
+
+    def operation_cost(self, operation):
+        root_type = {
+            'query': self.schema.get_query_type,
+            'mutation': self.schema.get_mutation_type,
+            'subscription': self.schema.get_subscription_type,
+        }[operation.operation]()
+        return self.selection_set_cost(root_type, operation.selection_set, frozenset())
+
+    def selection_set_cost(self, parent_type, selection_set, fragments_seen):
+        cost = 0
+        for selection in selection_set.selections:
+            if isinstance(selection, ast.Field):
+                cost += self.field_cost(parent_type, selection, fragments_seen)
+            elif isinstance(selection, ast.InlineFragment):
+                fragment_type = parent_type
+                if selection.type_condition:
+                    fragment_type = self.schema.get_type(selection.type_condition.name.value)
+                cost += self.selection_set_cost(fragment_type, selection.selection_set, fragments_seen)
+            elif isinstance(selection, ast.FragmentSpread):
+                name = selection.name.value
+                fragment = self.fragments.get(name)
+                if fragment is None or name in fragments_seen:
+                    continue
+                fragment_type = self.schema.get_type(fragment.type_condition.name.value)
+                cost += self.selection_set_cost(fragment_type, fragment.selection_set, fragments_seen | {name})
+        return cost
+
+    def field_cost(self, parent_type, field_ast, fragments_seen):
+        name = field_ast.name.value
+        field = getattr(parent_type, 'fields', {}).get(name)
+        if field is None:
+            return 0
+
+        key = f'{parent_type.name}.{name}'
+        weight = settings.GRAPHQL_FIELD_COSTS.get(key, 1 if field_ast.selection_set else 0)
+        batch_argument = settings.GRAPHQL_COST_BATCH_ARGUMENTS.get(key)
+        if batch_argument:
+            weight *= self.argument_length(field_ast, batch_argument)
+        if not field_ast.selection_set:
+            return weight
+
+        children = self.selection_set_cost(get_named_type(field.type), field_ast.selection_set, fragments_seen)
+        return weight + self.multiplier(parent_type, field, field_ast) * children
+
+    def multiplier(self, parent_type, field, field_ast):
+        if is_connection(parent_type):
+            return 1
+        first = self.argument_value(field_ast, 'first')
+        if first is not None:
+            first = max(first, 0)
+        if is_connection(get_named_type(field.type)):
+            return page_size(first)
+        if is_list(field.type):
+            # List resolvers treat a missing or zero `first` as no limit.
+            return min(first or settings.GRAPHQL_MAX_LIST_SIZE, settings.GRAPHQL_MAX_LIST_SIZE)
+        return 1
+
+    def argument_value(self, field_ast, name):
+        for argument in field_ast.arguments or []:
+            if argument.name.value != name:
+                continue
+            value = argument.value
+            if isinstance(value, ast.Variable):
+                return self.variables.get(value.name.value)
+            if isinstance(value, ast.IntValue):
+                return int(value.value)
+        return None
+
+    def argument_length(self, field_ast, name):
+        """The number of items passed to the list argument `name`, at least 1."""
+        for argument in field_ast.arguments or []:
+            if argument.name.value != name:
+                continue
+            value = argument.value
+            if isinstance(value, ast.Variable):
+                value = self.variables.get(value.name.value)
+                return max(len(value), 1) if isinstance(value, list) else 1
+            if isinstance(value, ast.ListValue):
+                return max(len(value.values), 1)
+        return 1
+
+
+def operation_cost(schema, document_ast, operation, variables=None):
+    return CostAnalyzer(schema, document_ast, variables).operation_cost(operation)
@@ -0,0 +1,91 @@
+from collections import defaultdict
+
+from django.conf import settings
+
+from promise import Promise
+from promise.dataloader import DataLoader
+
+
+class ModelLoader(DataLoader):
+    """Loads instances of a model by primary key, one `id__in` query per batch."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def batch_load_fn(self, keys):
+        instances = self.model.objects.in_bulk(keys)
+        return Promise.resolve([instances.get(key) for key in keys])
+
+
+class RelatedLoader(DataLoader):
+    """
+    Loads the reverse side of a foreign key, e.g. the votes of many links at once.
+
+    Like the top level lists, at most GRAPHQL_MAX_LIST_SIZE instances are
+    loaded per key. Each key gets its own LIMIT, combined with UNION ALL so
+    the batch still takes a single query.
+    """
+
+    def __init__(self, model, field_name):
+        super().__init__()
+        self.model = model
+        self.field_name = field_name
+
+    def batch_load_fn(self, keys):
+        attname = self.model._meta.get_field(self.field_name).attname
+        queries = [
+            self.model.objects.filter(**{self.field_name: key}).order_by('pk')[:settings.GRAPHQL_MAX_LIST_SIZE]
+            for key in keys
+        ]
+        related = defaultdict(list)
+        for instance in sorted(queries[0].union(*queries[1:], all=True), key=lambda instance: instance.pk):
+            related[getattr(instance, attname)].append(instance)
+        return Promise.resolve([related[key] for key in keys])
+
+
+def get_loader(info, loader_class, *args):
+    """
+    Return the loader for the current request.
+
+    Loaders are stored on `info.context` so that every resolver in the same
+    request shares one batch and one cache.
+    """
+    loaders = getattr(info.context, 'loaders', None)
+    if loaders is None:
+        loaders = info.context.loaders = {}
+
+    key = (loader_class,) + args
+    if key not in loaders:
+        loaders[key] = loader_class(*args)
+    return loaders[key]
+
+
+def load_object(info, instance, field_name):
+    """Resolve a forward foreign key through the request's ModelLoader."""
+    field = instance._meta.get_field(field_name)
+    if field.is_cached(instance):
+        return getattr(instance, field_name)
+
+    key = getattr(instance, field.attname)
+    if key is None:
+        return None
+    return get_loader(info, ModelLoader, field.related_model).load(key)
+
+
+def load_related(info, instance, accessor_name):
+    """
+    Resolve a reverse foreign key (e.g. `link.votes`) through the request's RelatedLoader,
+    unless it was already prefetched along with the instance.
+
+    A prefetch cannot be limited per instance, so a prefetched list is cut to
+    GRAPHQL_MAX_LIST_SIZE here, as RelatedLoader does in its query.
+    """
+    relation = next(
+        rel for rel in instance._meta.related_objects if rel.get_accessor_name() == accessor_name
+    )
+    prefetched = getattr(instance, '_prefetched_objects_cache', {})
+    if relation.get_cache_name() in prefetched:
+        return list(prefetched[relation.get_cache_name()])[:settings.GRAPHQL_MAX_LIST_SIZE]
+
+    return get_loader(info, RelatedLoader, relation.related_model, relation.field.name).load(instance.pk)
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PersistedQuery',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created_at')),
+                ('modified_at', models.DateTimeField(auto_now=True, verbose_name='modified_at')),
+                ('uid', models.UUIDField(default=uuid.uuid4, help_text='Unique ID for this model')),
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='SHA-256')),
+                ('query', models.TextField(verbose_name='query')),
+            ],
+            options={
+                'verbose_name': 'Persisted query',
+                'verbose_name_plural': 'Persisted queries',
+            },
+        ),
+    ]
@@ -3,6 +3,8 @@ import uuid
 from django.db import models
 from django.utils.translation import ugettext_lazy as _
 
+from website.core.backend import query_hash
+
 # Create your models here.
 
 
@@ -16,3 +18,22 @@ class DatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class PersistedQuery(DatedModel):
+    """
+    A GraphQL document that clients can execute by sending only its hash.
+    """
+    sha256 = models.CharField(_('SHA-256'), max_length=64, primary_key=True)
+    query = models.TextField(_('query'))
+
+    class Meta:
+        verbose_name = _('Persisted query')
+        verbose_name_plural = _('Persisted queries')
+
+    def __str__(self):
+        return self.sha256
+
+    def save(self, *args, **kwargs):
+        self.sha256 = query_hash(self.query)
+        super().save(*args, **kwargs)
@@ -0,0 +1,122 @@
+from collections import OrderedDict
+
+from django.db.models import Prefetch
+
+from graphene import relay
+from graphene.utils.str_converters import to_snake_case
+from graphql.language import ast
+from graphql.type.definition import get_named_type
+
+
+def model_fields(model):
+    """Every field and relation of `model` by the name DjangoObjectType gives it, e.g. `votes` for a reverse key."""
+    fields = {}
+    for field in model._meta.get_fields():
+        if field.auto_created and not field.concrete:
+            fields[field.get_accessor_name()] = field
+        else:
+            fields[field.name] = field
+    return fields
+
+
+class QueryOptimizer:
+    """
+    Plans the columns and joins needed to resolve a selection set.
+
+    Scalar fields go into `only()`, forward foreign keys are joined with
+    `select_related()` and reverse or many to many relations are loaded with
+    one `prefetch_related()` query each, recursively. A selected field that is
+    not a model field, e.g. a custom resolver, may need any column, so every
+    column of its model is loaded then.
+    """
+
+    def __init__(self, fragments):
+        self.fragments = fragments or {}
+
+    def selections(self, selection_set):
+        for selection in selection_set.selections:
+            if isinstance(selection, ast.Field):
+                yield selection
+            elif isinstance(selection, ast.InlineFragment):
+                yield from self.selections(selection.selection_set)
+            elif isinstance(selection, ast.FragmentSpread):
+                fragment = self.fragments.get(selection.name.value)
+                if fragment is not None:
+                    yield from self.selections(fragment.selection_set)
+
+    def group(self, field_asts):
+        """The sub fields selected under `field_asts`, by name, merging aliases and fragments."""
+        grouped = OrderedDict()
+        for field_ast in field_asts:
+            if field_ast.selection_set is None:
+                continue
+            for selection in self.selections(field_ast.selection_set):
+                grouped.setdefault(selection.name.value, []).append(selection)
+        return grouped
+
+    def plan(self, model, field_asts):
+        """Return (only, select_related, prefetches) for loading `model` under `field_asts`."""
+        fields = model_fields(model)
+        only = {model._meta.pk.attname}
+        select_related = []
+        prefetches = []
+
+        for name, selections in self.group(field_asts).items():
+            if name in ('__typename', 'id'):
+                continue
+            name = to_snake_case(name)
+            field = fields.get(name)
+            if field is None or (field.one_to_one and not field.concrete):
+                only.update(column.attname for column in model._meta.concrete_fields)
+            elif not field.is_relation:
+                only.add(field.attname)
+            elif field.many_to_one or field.one_to_one:
+                related_only, related_select, related_prefetches = self.plan(field.related_model, selections)
+                only.add(field.attname)
+                only.update(f'{name}__{column}' for column in related_only)
+                select_related.append(name)
+                select_related += [f'{name}__{lookup}' for lookup in related_select]
+                prefetches += [
+                    Prefetch(f'{name}__{prefetch.prefetch_through}', queryset=prefetch.queryset)
+                    for prefetch in related_prefetches
+                ]
+            else:
+                related_only, related_select, related_prefetches = self.plan(field.related_model, selections)
+                if field.one_to_many:
+                    # The key pointing back is needed to match the prefetched rows to their instances.
+                    related_only.add(field.field.attname)
+                queryset = apply_plan(
+                    field.related_model._default_manager.order_by('pk'),
+                    related_only, related_select, related_prefetches,
+                )
+                prefetches.append(Prefetch(name, queryset=queryset))
+
+        return only, select_related, prefetches
+
+
+def apply_plan(queryset, only, select_related, prefetches):
+    queryset = queryset.only(*only)
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetches:
+        queryset = queryset.prefetch_related(*prefetches)
+    return queryset
+
+
+def optimize(queryset, info, fields=()):
+    """
+    Load only what the selection set of the resolved field needs from `queryset`.
+
+    For a relay connection the selection under `edges { node }` is used.
+    `fields` are loaded in any case, e.g. the ordering a cursor is built from.
+    """
+    optimizer = QueryOptimizer(info.fragments)
+    field_asts = info.field_asts
+    graphene_type = getattr(get_named_type(info.return_type), 'graphene_type', None)
+    if isinstance(graphene_type, type) and issubclass(graphene_type, relay.Connection):
+        edges = optimizer.group(field_asts).get('edges', [])
+        field_asts = optimizer.group(edges).get('node', [])
+
+    only, select_related, prefetches = optimizer.plan(queryset.model, field_asts)
+    only.update(fields)
+    return apply_plan(queryset, only, select_related, prefetches)
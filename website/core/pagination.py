@@ -0,0 +1,99 @@
+import base64
+import datetime
+import json
+
+from django.conf import settings
+from django.db.models import Q
+
+from graphene.relay import PageInfo
+from graphql import GraphQLError
+
+
+def serialize_value(value):
+    # Unlike DjangoJSONEncoder, keep the microseconds so the cursor is exact.
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_cursor(values):
+    """Turn the sort key values of a row into an opaque cursor."""
+    data = json.dumps(values, default=serialize_value, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_cursor(cursor, ordering):
+    """Recover the sort key values from a cursor made by `encode_cursor`."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (TypeError, ValueError):
+        raise GraphQLError('Invalid cursor!')
+
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise GraphQLError('Invalid cursor!')
+    return values
+
+
+def keyset_filter(ordering, values):
+    """
+    Build the filter selecting every row after `values` in `ordering`.
+
+    For an ordering (a, b) this is `a >= x AND (a > x OR (a = x AND b > y))`,
+    with the comparisons flipped for descending fields. The leading `a >= x`
+    is redundant but gives the planner a range it can seek to on the index,
+    which it cannot derive from the OR alone. The last field of the ordering
+    must be unique so that no two rows share a position.
+    """
+    condition = Q()
+    for i, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        clause = Q(**{f'{name}__{lookup}': values[i]})
+        for previous, value in zip(ordering[:i], values):
+            clause &= Q(**{previous.lstrip('-'): value})
+        condition |= clause
+
+    first = ordering[0]
+    lookup = 'lte' if first.startswith('-') else 'gte'
+    return Q(**{f'{first.lstrip("-")}__{lookup}': values[0]}) & condition
+
+
+def page_size(first):
+    """Clamp a requested page size to the configured bounds."""
+    if first is None:
+        return settings.GRAPHQL_PAGE_SIZE
+    if first < 0:
+        raise GraphQLError('`first` must be a positive number!')
+    return min(first, settings.GRAPHQL_MAX_PAGE_SIZE)
+
+
+def connection_from_queryset(connection_type, queryset, ordering, first=None, after=None):
+    """
+    Resolve a relay connection with keyset pagination.
+
+    Instead of OFFSET, each page continues from the sort key of the cursor it
+    was given, so any page costs the same as the first one as long as the
+    ordering is backed by an index.
+    """
+    first = page_size(first)
+    if after:
+        queryset = queryset.filter(keyset_filter(ordering, decode_cursor(after, ordering)))
+
+    nodes = list(queryset.order_by(*ordering)[:first + 1])
+    has_next_page = len(nodes) > first
+    nodes = nodes[:first]
+
+    edges = [
+        connection_type.Edge(
+            node=node,
+            cursor=encode_cursor([getattr(node, field.lstrip('-')) for field in ordering]),
+        )
+        for node in nodes
+    ]
+    page_info = PageInfo(
+        start_cursor=edges[0].cursor if edges else None,
+        end_cursor=edges[-1].cursor if edges else None,
+        has_previous_page=bool(after),
+        has_next_page=has_next_page,
+    )
+    return connection_type(edges=edges, page_info=page_info)
@@ -0,0 +1,83 @@
+import random
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+
+class Profile:
+    """
+    Resolver timings and SQL statistics of one GraphQL operation.
+
+    Resolver time covers the synchronous part of each resolver; work deferred
+    to a DataLoader batch is counted in the DB time but not in the field.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.duration = None
+        self.queries = 0
+        self.query_time = 0.0
+        self.fields = defaultdict(lambda: [0, 0.0])
+
+    def record_field(self, name, duration):
+        stats = self.fields[name]
+        stats[0] += 1
+        stats[1] += duration
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_time += time.perf_counter() - started
+
+    def track_queries(self):
+        """Context manager counting the SQL queries on every database connection."""
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self.record_query))
+        return stack
+
+    def stop(self):
+        self.duration = time.perf_counter() - self.started
+
+    def summary(self, limit=10):
+        slowest = sorted(self.fields.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return {
+            'duration': round(self.duration * 1000, 3),
+            'queries': self.queries,
+            'queryDuration': round(self.query_time * 1000, 3),
+            'resolvers': [
+                {'field': name, 'calls': calls, 'duration': round(duration * 1000, 3)}
+                for name, (calls, duration) in slowest
+            ],
+        }
+
+
+class ProfilingMiddleware:
+    """Graphene middleware timing every resolver of an operation."""
+
+    def __init__(self, profile):
+        self.profile = profile
+
+    def resolve(self, next, root, info, **args):
+        started = time.perf_counter()
+        try:
+            return next(root, info, **args)
+        finally:
+            self.profile.record_field(f'{info.parent_type.name}.{info.field_name}', time.perf_counter() - started)
+
+
+def profile_requested(request):
+    """Staff (or anyone while DEBUG is on) may ask for a profile with the X-GraphQL-Profile header."""
+    if 'HTTP_X_GRAPHQL_PROFILE' not in request.META:
+        return False
+    return settings.DEBUG or request.user.is_staff
+
+
+def should_profile(request):
+    return profile_requested(request) or random.random() < settings.GRAPHQL_PROFILING_SAMPLE_RATE
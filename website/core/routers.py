@@ -0,0 +1,98 @@
+"""
+Send the reads of GraphQL queries to the read replica.
+
+Everything uses the primary (`default`) unless the code runs inside
+`use_replica()`, which GraphQLView enters for query operations. A user who
+has just run a mutation keeps reading from the primary for
+DATABASE_REPLICA_STICKY_SECONDS so they see their own writes, and nobody
+reads from the replica while it lags more than DATABASE_REPLICA_MAX_LAG
+seconds behind.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+REPLICA = 'replica'
+
+# Zero when the replica has replayed everything it received, otherwise the age of the last replayed transaction.
+REPLICA_LAG_SQL = """
+SELECT COALESCE(
+    CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+         ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END, 0)
+"""
+
+state = threading.local()
+replica_status = {'checked': None, 'fresh': False}
+
+
+@contextmanager
+def use_replica():
+    """Read from the replica, if there is a fresh one, inside this block."""
+    previous = getattr(state, 'replica', False)
+    state.replica = True
+    try:
+        yield
+    finally:
+        state.replica = previous
+
+
+def replica_lag():
+    """Seconds the replica is behind the primary, or None if it can't be reached."""
+    try:
+        with connections[REPLICA].cursor() as cursor:
+            cursor.execute(REPLICA_LAG_SQL)
+            return float(cursor.fetchone()[0])
+    except DatabaseError:
+        logger.warning('Could not check the lag of the read replica', exc_info=True)
+        return None
+
+
+def replica_is_fresh():
+    """Whether the replica is close enough to the primary, checked at most every few seconds per process."""
+    now = time.monotonic()
+    checked = replica_status['checked']
+    if checked is None or now - checked > settings.DATABASE_REPLICA_LAG_CHECK_INTERVAL:
+        lag = replica_lag()
+        replica_status['fresh'] = lag is not None and lag <= settings.DATABASE_REPLICA_MAX_LAG
+        replica_status['checked'] = now
+    return replica_status['fresh']
+
+
+def replica_available():
+    return REPLICA in settings.DATABASES and replica_is_fresh()
+
+
+def stick_to_primary(user):
+    """Read from the primary for a while after `user` wrote something, so they see it."""
+    if user.is_authenticated:
+        cache.set(f'primary-sticky:{user.pk}', True, timeout=settings.DATABASE_REPLICA_STICKY_SECONDS)
+
+
+def is_sticky(user):
+    return user.is_authenticated and cache.get(f'primary-sticky:{user.pk}') is not None
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if getattr(state, 'replica', False) and replica_available():
+            return REPLICA
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -0,0 +1,11 @@
+from django.contrib.sites.models import Site
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from website.core.utils import invalidate_site
+
+
+@receiver(post_save, sender=Site)
+@receiver(post_delete, sender=Site)
+def invalidate_cached_site(sender, instance, **kwargs):
+    invalidate_site(instance.pk)
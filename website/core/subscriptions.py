@@ -0,0 +1,37 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+
+# Every subscription connection listens to this channel layer group.
+GROUP = 'graphql-subscriptions'
+
+
+def publish(event):
+    """Send an event to every connected subscriber."""
+    async_to_sync(get_channel_layer().group_send)(GROUP, {'type': 'graphql.event', 'event': event})
+
+
+def publish_on_commit(event):
+    """Publish `event` once the current transaction commits."""
+    transaction.on_commit(lambda: publish(event))
+
+
+def serialize_instance(instance, exclude=()):
+    """Turn the concrete fields of a model instance into strings that can travel through the channel layer."""
+    data = {}
+    for field in instance._meta.concrete_fields:
+        if field.attname in exclude:
+            continue
+        value = field.value_from_object(instance)
+        data[field.attname] = None if value is None else field.value_to_string(instance)
+    return data
+
+
+def deserialize_instance(model, data):
+    """Rebuild an instance made by `serialize_instance` without touching the database."""
+    values = {}
+    for attname, value in data.items():
+        field = model._meta.get_field(attname)
+        values[attname] = None if value is None else field.to_python(value)
+    return model(**values)
@@ -0,0 +1,285 @@
+import json
+from contextlib import contextmanager
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.contrib.sites.models import Site
+from django.core.cache import cache
+from django.template.loader import get_template
+from graphql import parse
+
+from config.schema import schema
+from website.core.backend import query_hash
+from website.core.cache import LRUCache, invalidate_tags
+from website.core.cost import operation_cost
+from website.core.consumers import GraphQLSubscriptionConsumer
+from website.core import routers
+from website.core.models import PersistedQuery
+from website.core.routers import ReplicaRouter, is_sticky, use_replica
+from website.core.subscriptions import publish
+from website.core.utils import email_templates, full_url, full_urls, local_sites, render_email
+from website.links.models import Link
+from website.links.schema import serialize_link
+from website.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    local_sites.clear()
+
+
+def post_graphql(client, **data):
+    response = client.post('/graphql/', data=json.dumps(data), content_type='application/json')
+    return json.loads(response.content.decode())
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert 'a' in cache
+    assert 'b' not in cache
+    assert cache.get('c') == 3
+
+
+def test_persisted_query_registration(client):
+    query = '{ links { id } }'
+    extensions = {'persistedQuery': {'version': 1, 'sha256Hash': query_hash(query)}}
+
+    response = post_graphql(client, extensions=extensions)
+    assert response['errors'][0]['message'] == 'PersistedQueryNotFound'
+
+    response = post_graphql(client, query=query, extensions=extensions)
+    assert response['data'] == {'links': []}
+    assert PersistedQuery.objects.filter(sha256=query_hash(query)).exists()
+
+    response = post_graphql(client, extensions=extensions)
+    assert response['data'] == {'links': []}
+
+
+def test_persisted_query_registered_after_being_sent_in_full(client):
+    query = '{ links { id } }'
+    post_graphql(client, query=query)
+
+    extensions = {'persistedQuery': {'version': 1, 'sha256Hash': query_hash(query)}}
+    post_graphql(client, query=query, extensions=extensions)
+
+    assert PersistedQuery.objects.filter(sha256=query_hash(query)).exists()
+
+
+def test_persisted_query_hash_mismatch(client):
+    extensions = {'persistedQuery': {'version': 1, 'sha256Hash': query_hash('{ votes { id } }')}}
+    response = client.post(
+        '/graphql/', data=json.dumps({'query': '{ links { id } }', 'extensions': extensions}),
+        content_type='application/json',
+    )
+    assert response.status_code == 400
+
+
+def test_anonymous_response_cache_invalidated_by_tag(client):
+    assert post_graphql(client, query='{ links { id } }')['data'] == {'links': []}
+
+    link = Link.objects.create(url='https://example.com/')
+    assert post_graphql(client, query='{ links { id } }')['data'] == {'links': []}
+
+    invalidate_tags('links')
+    assert post_graphql(client, query='{ links { id } }')['data'] == {'links': [{'id': str(link.id)}]}
+
+
+def test_query_cost_reported_in_extensions(client):
+    response = post_graphql(client, query='{ links(first: 10) { id postedBy { id } } }')
+    assert response['extensions']['cost']['requested'] == 12
+
+
+def test_query_cost_uses_the_server_list_limit(client, settings):
+    settings.GRAPHQL_MAX_LIST_SIZE = 50
+
+    for query in ('{ links { postedBy { id } } }', '{ links(first: 100000) { postedBy { id } } }'):
+        assert post_graphql(client, query=query)['extensions']['cost']['requested'] == 52
+
+
+def test_query_over_cost_budget_is_rejected(client, settings):
+    settings.GRAPHQL_MAX_QUERY_COST = 1000
+    response = post_graphql(client, query='{ links { votes { link { votes { id } } } } }')
+
+    assert 'data' not in response
+    assert 'exceeds the maximum' in response['errors'][0]['message']
+
+
+def test_create_links_cost_grows_with_input(client, settings):
+    settings.GRAPHQL_MAX_QUERY_COST = 2
+    links = [{'url': f'https://example.com/{i}'} for i in range(3)]
+
+    response = post_graphql(
+        client,
+        query='mutation ($links: [LinkInput!]!) { createLinks(input: $links) { ids } }',
+        variables={'links': links},
+    )
+
+    assert 'exceeds the maximum' in response['errors'][0]['message']
+    assert not Link.objects.exists()
+
+
+def test_full_create_links_batch_fits_the_cost_budget(settings):
+    document = parse('mutation ($links: [LinkInput!]!) { createLinks(input: $links) { ids errors { index message } } }')
+    links = [{'url': f'https://example.com/{i}'} for i in range(settings.GRAPHQL_MAX_BULK_CREATE_SIZE)]
+
+    cost = operation_cost(schema, document, document.definitions[0], {'links': links})
+
+    assert cost <= settings.GRAPHQL_MAX_QUERY_COST
+
+
+def test_batched_operations(client):
+    response = client.post('/graphql/', data=json.dumps([
+        {'query': '{ links { id } }', 'id': 1},
+        {'query': '{ votes { id } }', 'id': 2},
+    ]), content_type='application/json')
+    results = json.loads(response.content.decode())
+
+    assert [result['id'] for result in results] == [1, 2]
+    assert results[0]['data'] == {'links': []}
+    assert results[1]['data'] == {'votes': []}
+
+
+def test_batch_size_is_limited(client, settings):
+    settings.GRAPHQL_MAX_BATCH_SIZE = 1
+    response = client.post('/graphql/', data=json.dumps([
+        {'query': '{ links { id } }'},
+        {'query': '{ votes { id } }'},
+    ]), content_type='application/json')
+
+    assert response.status_code == 400
+
+
+def test_profile_in_extensions_for_staff(client):
+    client.force_login(UserFactory(is_staff=True))
+    Link.objects.create(url='https://example.com/')
+
+    response = client.post(
+        '/graphql/', data=json.dumps({'query': '{ links { id postedBy { id } } }'}),
+        content_type='application/json', HTTP_X_GRAPHQL_PROFILE='1',
+    )
+    profile = json.loads(response.content.decode())['extensions']['profile']
+
+    assert profile['queries'] >= 1
+    assert 'Query.links' in [resolver['field'] for resolver in profile['resolvers']]
+
+
+def test_full_urls_resolve_the_site_once(django_assert_num_queries):
+    with django_assert_num_queries(1):
+        urls = full_urls([('/password/', {'token': 'a b&c'}), ('/links/', None)])
+        assert full_url('/') == 'https://example.com/'
+
+    assert urls == ['https://example.com/password/?token=a+b%26c', 'https://example.com/links/']
+
+
+def test_site_change_invalidates_cached_site(settings):
+    assert full_url('/') == 'https://example.com/'
+
+    site = Site.objects.get(id=settings.SITE_ID)
+    site.domain = 'new.example.com'
+    site.save()
+
+    assert full_url('/') == 'https://new.example.com/'
+
+
+def test_email_templates_are_compiled_once(monkeypatch):
+    email_templates.clear()
+    loaded = []
+    monkeypatch.setattr('website.core.utils.get_template', lambda name: loaded.append(name) or get_template(name))
+
+    for _ in range(2):
+        message = render_email('Subject', 'users/emails/no_account', 'someone@example.com', None)
+
+    assert loaded == ['users/emails/no_account.html', 'users/emails/no_account.txt']
+    assert message.alternatives[0][1] == 'text/html'
+
+
+def test_router_reads_from_fresh_replica_inside_use_replica(monkeypatch):
+    router = ReplicaRouter()
+    monkeypatch.setattr(routers, 'replica_available', lambda: True)
+
+    assert router.db_for_read(Link) == 'default'
+    with use_replica():
+        assert router.db_for_read(Link) == 'replica'
+        assert router.db_for_write(Link) == 'default'
+
+    monkeypatch.setattr(routers, 'replica_available', lambda: False)
+    with use_replica():
+        assert router.db_for_read(Link) == 'default'
+
+
+def test_cached_queries_and_batches_after_a_mutation_read_from_primary(client, monkeypatch):
+    replica_reads = []
+
+    @contextmanager
+    def recording_use_replica():
+        replica_reads.append(True)
+        yield
+
+    monkeypatch.setattr('website.core.views.use_replica', recording_use_replica)
+    existing_link = {'query': '{ existingLink(url: "https://example.com/") { id } }'}
+
+    post_graphql(client, **existing_link)
+    assert len(replica_reads) == 1
+
+    post_graphql(client, query='{ links { id } }')
+    assert len(replica_reads) == 1
+
+    client.post('/graphql/', data=json.dumps([
+        {'query': 'mutation { createVote(linkId: 0) { created } }'}, existing_link,
+    ]), content_type='application/json')
+    assert len(replica_reads) == 1
+
+
+def test_mutation_sticks_user_to_primary(client):
+    user = UserFactory()
+    client.force_login(user)
+    assert not is_sticky(user)
+
+    post_graphql(client, query='mutation { createLink(url: "https://example.com/", description: "") { id } }')
+
+    assert is_sticky(user)
+
+
+def test_subscription_receives_created_links():
+    # The consumer runs in its own thread, which cannot see the uncommitted poster: it must come with the event.
+    user = UserFactory()
+    link = Link.objects.create(url='https://example.com/', posted_by=user)
+    event = {'type': 'link.created', 'link': serialize_link(link)}
+
+    async def run():
+        communicator = WebsocketCommunicator(
+            GraphQLSubscriptionConsumer, '/subscriptions/', subprotocols=['graphql-ws'],
+        )
+        connected, subprotocol = await communicator.connect()
+        assert (connected, subprotocol) == (True, 'graphql-ws')
+
+        await communicator.send_json_to({'type': 'connection_init'})
+        assert await communicator.receive_json_from() == {'type': 'connection_ack'}
+
+        query = 'subscription { linkCreated { url postedBy { email } } }'
+        await communicator.send_json_to({'type': 'start', 'id': '1', 'payload': {'query': query}})
+        # Messages are handled in order, so once this is acknowledged the subscription is running.
+        await communicator.send_json_to({'type': 'connection_init'})
+        assert await communicator.receive_json_from() == {'type': 'connection_ack'}
+
+        await sync_to_async(publish)(event)
+        assert await communicator.receive_json_from() == {
+            'type': 'data', 'id': '1',
+            'payload': {'data': {'linkCreated': {'url': link.url, 'postedBy': {'email': user.email}}}},
+        }
+
+        await communicator.send_json_to({'type': 'stop', 'id': '1'})
+        await sync_to_async(publish)(event)
+        assert await communicator.receive_nothing()
+        await communicator.disconnect()
+
+    async_to_sync(run)()
@@ -1,24 +1,115 @@
+import threading
+from urllib.parse import urlencode
+
 from django.conf import settings
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.mail import EmailMessage, EmailMultiAlternatives
 from django.contrib.sites.models import Site
 from django.template import TemplateDoesNotExist
-from django.template.loader import render_to_string
+from django.template.loader import get_template
+
+from website.core.cache import LRUCache
 
 User = get_user_model()
 
+# Sites by id, trusted for SITE_CACHE_TTL seconds by each process.
+local_sites = LRUCache(100, ttl=settings.SITE_CACHE_TTL)
+
+
+def get_site(site_id=None):
+    """
+    Return the Site with `site_id`, or the current one, without a query on every call.
+
+    Sites are cached per process and in the shared cache, and dropped from both
+    when a site is saved or deleted (see website.core.signals). Other processes
+    may keep their copy for up to SITE_CACHE_TTL seconds.
+    """
+    site_id = site_id or settings.SITE_ID
+    site = local_sites.get(site_id)
+    if site is not None:
+        return site
+
+    key = f'site:{site_id}'
+    site = cache.get(key)
+    if site is None:
+        site = Site.objects.get(id=site_id)
+        cache.set(key, site, timeout=None)
+    local_sites.set(site_id, site)
+    return site
 
-def full_url(path, query_dict={}, site_id=settings.SITE_ID):
+
+def invalidate_site(site_id):
+    cache.delete(f'site:{site_id}')
+    local_sites.delete(site_id)
+
+
+def full_url(path, query_dict=None, site_id=None):
     """Turn a relative URL into an absolute URL."""
-    site = Site.objects.get(id=site_id)
+    return full_urls([(path, query_dict)], site_id=site_id)[0]
 
-    if query_dict:
-        query = '?'+'&'.join(f'{k}={v}' for k,v in query_dict.items())
-    else:
-        query = ''
 
-    return f'{site.domain}{path}{query}'
+def full_urls(urls, site_id=None):
+    """
+    Turn many relative URLs into absolute URLs at once, e.g. for a mailing.
+
+    `urls` is an iterable of (path, query_dict) pairs where query_dict may be
+    None. The site is resolved once, the URLs use SITE_URL_SCHEME and the
+    query strings are URL encoded.
+    """
+    base = f'{settings.SITE_URL_SCHEME}://{get_site(site_id).domain}'
+    return [
+        f'{base}{path}?{urlencode(query_dict)}' if query_dict else f'{base}{path}'
+        for path, query_dict in urls
+    ]
+
+
+class EmailTemplates:
+    """
+    The compiled variants of every email template, by template prefix.
+
+    The first time a prefix is used, its `.html` and `.txt` variants are
+    looked up and compiled, later emails only render them. Worker processes
+    compile the EMAIL_TEMPLATE_PREFIXES up front with `warm_up`.
+    """
+
+    extensions = ('html', 'txt')
+
+    def __init__(self):
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def get(self, template_prefix):
+        templates = self._templates.get(template_prefix)
+        if templates is None:
+            templates = self.load(template_prefix)
+            with self._lock:
+                self._templates[template_prefix] = templates
+        return templates
+
+    def load(self, template_prefix):
+        templates = {}
+        for ext in self.extensions:
+            try:
+                templates[ext] = get_template(f'{template_prefix}.{ext}')
+            except TemplateDoesNotExist:
+                pass
+
+        if not templates:
+            raise TemplateDoesNotExist(f'A template with the prefix {template_prefix} does not exist.')
+        return templates
+
+    def warm_up(self, template_prefixes):
+        for template_prefix in template_prefixes:
+            self.get(template_prefix)
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+
+
+email_templates = EmailTemplates()
 
 
 def render_email(subject, template_prefix, to_email, context, from_email=None):
@@ -31,17 +122,10 @@ def render_email(subject, template_prefix, to_email, context, from_email=None):
 
     from_email = from_email or settings.DEFAULT_FROM_EMAIL
 
-    bodies = {}
-    for ext in ['html', 'txt']:
-        try:
-            template_name = '{0}.{1}'.format(template_prefix, ext)
-            bodies[ext] = render_to_string(template_name,
-                                           context).strip()
-        except TemplateDoesNotExist:
-            pass
-
-    if not bodies:
-        raise TemplateDoesNotExist(f'A template with the prefix {template_prefix} does not exist.')
+    bodies = {
+        ext: template.render(context).strip()
+        for ext, template in email_templates.get(template_prefix).items()
+    }
 
     if 'txt' in bodies:
 
@@ -58,4 +142,3 @@ def render_email(subject, template_prefix, to_email, context, from_email=None):
                            [to_email])
         msg.content_subtype = 'html'
     return msg
-
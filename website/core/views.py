@@ -0,0 +1,287 @@
+import json
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseBadRequest
+
+from graphene_django.views import GraphQLView as BaseGraphQLView, HttpError
+from graphql import GraphQLError
+from graphql.execution import ExecutionResult
+from graphql.language import ast
+
+from website.core.backend import CachedDocumentBackend, get_operation, query_hash
+from website.core.cache import tag_versions
+from website.core.cost import operation_cost
+from website.core.models import PersistedQuery
+from website.core.profiling import Profile, ProfilingMiddleware, profile_requested, should_profile
+from website.core.routers import is_sticky, stick_to_primary, use_replica
+
+logger = logging.getLogger(__name__)
+
+
+document_backend = CachedDocumentBackend(maxsize=settings.GRAPHQL_DOCUMENT_CACHE_SIZE)
+
+
+class GraphQLView(BaseGraphQLView):
+    """
+    The GraphQL endpoint.
+
+    Supports automatic persisted queries: a client may send
+    `extensions: {"persistedQuery": {"version": 1, "sha256Hash": ...}}`
+    instead of the query. If the hash is unknown the response is a
+    `PersistedQueryNotFound` error, and the client retries with both the
+    query and the hash to register it, if GRAPHQL_PERSISTED_QUERIES_REGISTER
+    allows it, which it doesn't in production.
+
+    A JSON array of operations is executed as a batch in one request, sharing
+    its transaction and DataLoaders, and answered with an array of results
+    in the same order. Batches are limited to GRAPHQL_MAX_BATCH_SIZE.
+
+    Operations are rejected before execution when their estimated cost is
+    above GRAPHQL_MAX_QUERY_COST, and the cost is reported in the response
+    `extensions`. Results of anonymous queries are cached according to
+    GRAPHQL_RESPONSE_CACHE.
+
+    A sample of operations (GRAPHQL_PROFILING_SAMPLE_RATE) is profiled, and
+    logged if slower than GRAPHQL_PROFILING_SLOW_MS. Staff can request the
+    profile in the response `extensions` with the X-GraphQL-Profile header.
+
+    Queries read from the read replica when one is configured, see
+    `database_routing` for the operations that use the primary.
+    """
+
+    profile = None
+
+    def get_backend(self, request):
+        return document_backend
+
+    def get_middleware(self, request):
+        middleware = super().get_middleware(request)
+        if self.profile is None:
+            return middleware
+        return list(middleware or []) + [ProfilingMiddleware(self.profile)]
+
+    def parse_body(self, request):
+        if self.get_content_type(request) != 'application/json':
+            return super().parse_body(request)
+
+        try:
+            data = json.loads(request.body.decode('utf-8'))
+        except (TypeError, ValueError):
+            raise HttpError(HttpResponseBadRequest('POST body sent invalid JSON.'))
+
+        if isinstance(data, list):
+            if not data:
+                raise HttpError(HttpResponseBadRequest('Received an empty list in the batch request.'))
+            if len(data) > settings.GRAPHQL_MAX_BATCH_SIZE:
+                raise HttpError(HttpResponseBadRequest(
+                    f'A batch may contain at most {settings.GRAPHQL_MAX_BATCH_SIZE} operations.'
+                ))
+            if not all(isinstance(entry, dict) for entry in data):
+                raise HttpError(HttpResponseBadRequest('Every operation in a batch must be a JSON object.'))
+            # Django creates a view instance per request, so this only affects the current one.
+            self.batch = True
+        elif not isinstance(data, dict):
+            raise HttpError(HttpResponseBadRequest('The received data is not a valid JSON query.'))
+
+        return data
+
+    def get_graphql_params(self, request, data):
+        query, variables, operation_name, id = super().get_graphql_params(request, data)
+
+        query_id = self.get_persisted_query_id(request, data)
+        if query_id:
+            if query:
+                if query_hash(query) != query_id:
+                    raise HttpError(HttpResponseBadRequest('The persisted query hash does not match the query.'))
+                persist_query(query_id, query)
+            else:
+                query = get_persisted_query(query_id)
+                if query is None:
+                    raise HttpError(HttpResponse(), 'PersistedQueryNotFound')
+
+        return query, variables, operation_name, id
+
+    def get_response(self, request, data, show_graphiql=False):
+        try:
+            query, variables, operation_name, id = self.get_graphql_params(request, data)
+        except HttpError as e:
+            if not self.batch:
+                raise
+            # Report the error of a single operation without failing the rest of the batch.
+            status_code = e.response.status_code
+            response = {'errors': [self.format_error(e)], 'id': data.get('id'), 'status': status_code}
+            return self.json_encode(request, response), status_code
+
+        execution_result = self.execute_graphql_request(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+
+        status_code = 200
+        if execution_result:
+            response = {}
+
+            if execution_result.errors:
+                response['errors'] = [self.format_error(e) for e in execution_result.errors]
+
+            if execution_result.invalid:
+                status_code = 400
+            else:
+                response['data'] = execution_result.data
+
+            if execution_result.extensions:
+                response['extensions'] = execution_result.extensions
+
+            if self.batch:
+                response['id'] = id
+                response['status'] = status_code
+
+            result = self.json_encode(request, response, pretty=show_graphiql)
+        else:
+            result = None
+
+        return result, status_code
+
+    def execute_graphql_request(self, request, data, query, variables, operation_name, show_graphiql=False):
+        document, operation = self.get_operation(request, query, operation_name)
+        if operation is None:
+            # Let graphene report the syntax or validation errors.
+            return super().execute_graphql_request(
+                request, data, query, variables, operation_name, show_graphiql
+            )
+
+        cost = operation_cost(self.schema, document.document_ast, operation, variables)
+        extensions = {'cost': {'requested': cost, 'maximum': settings.GRAPHQL_MAX_QUERY_COST}}
+        if cost > settings.GRAPHQL_MAX_QUERY_COST:
+            error = GraphQLError(f'Query cost {cost} exceeds the maximum of {settings.GRAPHQL_MAX_QUERY_COST}.')
+            return ExecutionResult(errors=[error], invalid=True, extensions=extensions)
+
+        cache_key, timeout = self.get_response_cache_key(request, document, operation, variables, operation_name)
+        if cache_key:
+            cached_data = cache.get(cache_key)
+            if cached_data is not None:
+                return ExecutionResult(data=cached_data, extensions=extensions)
+
+        self.profile = Profile() if should_profile(request) else None
+        with self.database_routing(request, operation, cached=bool(cache_key)):
+            if self.profile is None:
+                execution_result = super().execute_graphql_request(
+                    request, data, query, variables, operation_name, show_graphiql
+                )
+            else:
+                with self.profile.track_queries():
+                    execution_result = super().execute_graphql_request(
+                        request, data, query, variables, operation_name, show_graphiql
+                    )
+                extensions.update(self.report_profile(request, operation_name))
+        if not execution_result:
+            return execution_result
+
+        if cache_key and not execution_result.errors:
+            cache.set(cache_key, execution_result.data, timeout)
+
+        execution_result.extensions = dict(execution_result.extensions or {}, **extensions)
+        return execution_result
+
+    @contextmanager
+    def database_routing(self, request, operation, cached=False):
+        """
+        Read from the replica for queries, see website.core.routers.
+
+        The primary is used for mutations and for the users who just ran one.
+        It is also used for the rest of a batch after a mutation, since the
+        replica can't see the writes of the open transaction, and for queries
+        whose result is cached, so a result read from a lagging replica is
+        never cached under the tag versions of newer writes.
+        """
+        if operation.operation == 'mutation':
+            request._graphql_wrote = True
+            stick_to_primary(request.user)
+            yield
+        elif cached or getattr(request, '_graphql_wrote', False) or is_sticky(request.user):
+            yield
+        else:
+            with use_replica():
+                yield
+
+    def report_profile(self, request, operation_name):
+        """Log a slow profiled operation and return the extensions to add to its response."""
+        self.profile.stop()
+        summary = self.profile.summary()
+        self.profile = None
+
+        if summary['duration'] > settings.GRAPHQL_PROFILING_SLOW_MS:
+            logger.warning('Slow GraphQL operation %s: %s', operation_name or '<anonymous>', json.dumps(summary))
+
+        return {'profile': summary} if profile_requested(request) else {}
+
+    def get_operation(self, request, query, operation_name):
+        """
+        Return the cached document of a query and the operation to execute.
+
+        The operation is None if the query can not be parsed or is invalid.
+        """
+        if not query:
+            return None, None
+
+        try:
+            document = self.get_backend(request).document_from_string(self.schema, query)
+        except Exception:
+            return None, None
+
+        if not document.is_valid:
+            return document, None
+        return document, get_operation(document.document_ast, operation_name)
+
+    def get_response_cache_key(self, request, document, operation, variables, operation_name):
+        """
+        Return the cache key and timeout for the result of an operation.
+
+        Only queries from anonymous users, whose root fields all appear in
+        GRAPHQL_RESPONSE_CACHE, are cached. Otherwise return (None, None).
+        """
+        if operation.operation != 'query' or not settings.GRAPHQL_RESPONSE_CACHE or request.user.is_authenticated:
+            return None, None
+
+        policies = []
+        for selection in operation.selection_set.selections:
+            if not isinstance(selection, ast.Field) or selection.name.value not in settings.GRAPHQL_RESPONSE_CACHE:
+                return None, None
+            policies.append(settings.GRAPHQL_RESPONSE_CACHE[selection.name.value])
+
+        timeout = min(policy_timeout for policy_timeout, _ in policies)
+        tags = sorted({tag for _, policy_tags in policies for tag in policy_tags})
+        key = query_hash(json.dumps(
+            [document.normalized_hash, operation_name, variables, tag_versions(tags)], sort_keys=True
+        ))
+        return f'graphql-response:{key}', timeout
+
+    @staticmethod
+    def get_persisted_query_id(request, data):
+        extensions = request.GET.get('extensions') or data.get('extensions') or {}
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpError(HttpResponseBadRequest('Extensions are invalid JSON.'))
+
+        persisted_query = extensions.get('persistedQuery') if isinstance(extensions, dict) else None
+        if not persisted_query:
+            return None
+        return persisted_query.get('sha256Hash')
+
+
+def get_persisted_query(query_id):
+    """Look up a persisted query, first in the document cache, then in the database."""
+    document = document_backend.documents.get(query_id)
+    if document is not None:
+        return document.document_string
+    return PersistedQuery.objects.filter(sha256=query_id).values_list('query', flat=True).first()
+
+
+def persist_query(query_id, query):
+    # The document cache of this process may hold the query without it being stored, e.g. after it was sent in full.
+    if settings.GRAPHQL_PERSISTED_QUERIES_REGISTER:
+        PersistedQuery.objects.get_or_create(sha256=query_id, defaults={'query': query})
@@ -0,0 +1,173 @@
+import itertools
+import json
+import random
+import statistics
+import time
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+
+from config.schema import schema
+from website.core.pagination import encode_cursor
+from website.core.profiling import Profile
+from website.links.models import Link, Vote
+
+User = get_user_model()
+
+BENCHMARK_EMAIL = 'benchmark@example.com'
+BENCHMARK_PASSWORD = 'benchmark-password'
+CHUNK_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed links, votes and users and time the main GraphQL operations through config.schema.schema. '
+        'Everything runs in a transaction that is rolled back, unless --keep is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--links', type=int, default=10000, help='Number of links to seed, e.g. 10000, 100000 or 1000000.',
+        )
+        parser.add_argument('--votes', type=int, default=None, help='Number of votes to seed, defaults to --links.')
+        parser.add_argument('--users', type=int, default=1000, help='Number of users to seed.')
+        parser.add_argument('--repeat', type=int, default=5, help='Number of times each operation is timed.')
+        parser.add_argument('--output', default=None, help='Write the JSON results to this file instead of stdout.')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded data.')
+
+    def handle(self, *args, links, votes, users, repeat, output, keep, **options):
+        votes = links if votes is None else votes
+
+        with transaction.atomic():
+            seed_started = time.perf_counter()
+            user = self.seed(links, votes, users)
+            seed_duration = time.perf_counter() - seed_started
+
+            results = self.run_benchmarks(user, links, repeat)
+            if not keep:
+                transaction.set_rollback(True)
+
+        report = json.dumps({
+            'database': connection.vendor,
+            'volumes': {'links': links, 'votes': votes, 'users': users},
+            'repeat': repeat,
+            'seed_duration': round(seed_duration, 3),
+            'results': results,
+        }, indent=2)
+
+        if output:
+            with open(output, 'w') as f:
+                f.write(report)
+        else:
+            self.stdout.write(report)
+
+    def seed(self, link_count, vote_count, user_count):
+        # Imported here, factory_boy is a development dependency.
+        from website.users.tests.factories import UserFactory
+
+        # The factory hashes a random password for every user, use a cheap hasher while seeding.
+        with override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']):
+            users = [UserFactory.build(email=f'benchmark{i}@example.com') for i in range(user_count)]
+        User.objects.bulk_create(users, batch_size=CHUNK_SIZE)
+        user_ids = list(User.objects.filter(email__in=[user.email for user in users]).values_list('id', flat=True))
+
+        user = User(username='benchmark', email=BENCHMARK_EMAIL)
+        user.set_password(BENCHMARK_PASSWORD)
+        user.save()
+
+        now = timezone.now()
+        for start in range(0, link_count, CHUNK_SIZE):
+            links = [
+                Link(
+                    url=f'https://example.com/{i}/benchmark-link',
+                    description=f'Benchmark link number {i}',
+                    posted_by_id=random.choice(user_ids),
+                    created_at=now - timedelta(minutes=link_count - i),
+                )
+                for i in range(start, min(start + CHUNK_SIZE, link_count))
+            ]
+            for link in links:
+                link.set_canonical_url()
+            Link.objects.bulk_create(links)
+
+        link_ids = list(Link.objects.values_list('id', flat=True))
+        pairs = set()
+        while len(pairs) < min(vote_count, len(user_ids) * len(link_ids)):
+            pairs.add((random.choice(user_ids), random.choice(link_ids)))
+        pairs = list(pairs)
+        for start in range(0, len(pairs), CHUNK_SIZE):
+            Vote.objects.bulk_create(
+                [Vote(user_id=user_id, link_id=link_id) for user_id, link_id in pairs[start:start + CHUNK_SIZE]],
+                ignore_conflicts=True,
+            )
+        call_command('rebuild_vote_counts', stdout=StringIO())
+
+        # Autovacuum has not seen the rows yet, without statistics the planner would assume empty tables.
+        with connection.cursor() as cursor:
+            for model in (User, Link, Vote):
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+        return user
+
+    def run_benchmarks(self, user, link_count, repeat):
+        deep = max(link_count - 20, 0)
+        deep_link = Link.objects.order_by('-id')[deep:deep + 1].first()
+        deep_cursor = encode_cursor([deep_link.id]) if deep_link else None
+        new_links = itertools.count()
+        # There may be fewer links than repetitions, voting on a link again then times the no-op path.
+        link_ids = itertools.cycle(Link.objects.order_by('?').values_list('id', flat=True)[:repeat] or [0])
+
+        operations = {
+            'links': ('{ links(first: 20) { id url postedBy { id } } }', lambda: {}),
+            'links_search': ('{ links(search: "benchmark 42", first: 20) { id url } }', lambda: {}),
+            'links_deep_skip': (
+                'query ($skip: Int) { links(skip: $skip, first: 20) { id } }', lambda: {'skip': deep},
+            ),
+            'links_deep_cursor': (
+                'query ($after: String) { linksConnection(first: 20, after: $after) { edges { node { id } } } }',
+                lambda: {'after': deep_cursor},
+            ),
+            'votes': ('{ votes { id user { id } link { id } } }', lambda: {}),
+            'create_link': (
+                'mutation ($url: String) { createLink(url: $url, description: "New") { id } }',
+                lambda: {'url': f'https://example.com/new/{next(new_links)}'},
+            ),
+            'create_vote': (
+                'mutation ($link: Int) { createVote(linkId: $link) { created } }', lambda: {'link': next(link_ids)},
+            ),
+            'token_auth': (
+                'mutation ($email: String!, $password: String!) '
+                '{ tokenAuth(email: $email, password: $password) { token } }',
+                lambda: {'email': BENCHMARK_EMAIL, 'password': BENCHMARK_PASSWORD},
+            ),
+        }
+
+        results = {}
+        for name, (query, variables) in operations.items():
+            durations, queries, errors = [], [], []
+            for _ in range(repeat):
+                request = RequestFactory().post('/graphql/')
+                request.user = user
+                profile = Profile()
+                with profile.track_queries():
+                    result = schema.execute(query, context_value=request, variable_values=variables())
+                profile.stop()
+                durations.append(profile.duration * 1000)
+                queries.append(profile.queries)
+                errors += [str(error) for error in result.errors or []]
+
+            results[name] = {
+                'min_ms': round(min(durations), 3),
+                'median_ms': round(statistics.median(durations), 3),
+                'max_ms': round(max(durations), 3),
+                'queries': max(queries),
+                'errors': sorted(set(errors)),
+            }
+            self.stderr.write(f'{name}: {results[name]["median_ms"]} ms')
+        return results
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from website.links.models import Link, Vote
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized Link.vote_count from the Vote table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help='Number of links to update per transaction.',
+        )
+
+    def handle(self, *args, batch_size, **options):
+        votes = (
+            Vote.objects.filter(link=OuterRef('pk'))
+                        .order_by()
+                        .values('link')
+                        .annotate(count=Count('pk'))
+                        .values('count')
+        )
+        vote_count = Coalesce(Subquery(votes, output_field=IntegerField()), 0)
+
+        updated = 0
+        last_id = 0
+        while True:
+            ids = list(Link.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            with transaction.atomic():
+                updated += Link.objects.filter(id__gte=ids[0], id__lte=ids[-1]).update(vote_count=vote_count)
+            last_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the vote count of {updated} links.'))
@@ -0,0 +1,83 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connections
+from django.db.models import F, Q, QuerySet
+
+from website.links.utils import canonicalize_url, url_hash
+
+
+class LinkQuerySet(QuerySet):
+
+    def existing(self, url):
+        """Return the link already submitted for `url` in any spelling, with a single unique index lookup."""
+        try:
+            canonical_url = canonicalize_url(url)
+        except ValueError:
+            return None
+        return self.filter(url_hash=url_hash(canonical_url)).first()
+
+    def search(self, text):
+        """
+        Filter links matching `text`, ordered by relevance.
+
+        Words are matched as prefixes against the `search_vector` column and the
+        whole text as a substring of the url or the description; all of them
+        are served by GIN indexes.
+        """
+        words = re.findall(r'\w+', text)
+        condition = Q(url__icontains=text) | Q(description__icontains=text)
+        rank = TrigramSimilarity('url', text)
+        if words:
+            query = SearchQuery(' & '.join(f'{word}:*' for word in words), config='english', search_type='raw')
+            condition |= Q(search_vector=query)
+            rank = rank + SearchRank(F('search_vector'), query)
+
+        return self.filter(condition).annotate(rank=rank).order_by('-rank', 'id')
+
+
+class VoteQuerySet(QuerySet):
+
+    def cast(self, user, link_id):
+        """
+        Record a vote of `user` on a link and bump the link's vote count.
+
+        Runs as a single statement that does nothing if the user has already
+        voted on the link, and returns (link, created) like `get_or_create`:
+        the link with its current vote count and whether a new vote was
+        stored. Raises the link model's DoesNotExist if there is no such link.
+        """
+        vote_table = self.model._meta.db_table
+        link_model = self.model._meta.get_field('link').related_model
+        link_table = link_model._meta.db_table
+        link_fields = [field for field in link_model._meta.concrete_fields if field.attname != 'search_vector']
+        # The SELECT sees the link as it was before the UPDATE of the same statement, hence the COALESCE.
+        columns = ', '.join(
+            f'COALESCE(updated.vote_count, {link_table}.vote_count)' if field.attname == 'vote_count'
+            else f'{link_table}.{field.column}'
+            for field in link_fields
+        )
+        sql = f"""
+            WITH vote AS (
+                INSERT INTO {vote_table} (user_id, link_id)
+                SELECT %s, id FROM {link_table} WHERE id = %s
+                ON CONFLICT (user_id, link_id) DO NOTHING
+                RETURNING link_id
+            ), updated AS (
+                UPDATE {link_table} SET vote_count = {link_table}.vote_count + 1
+                FROM vote WHERE {link_table}.id = vote.link_id
+                RETURNING {link_table}.id, {link_table}.vote_count
+            )
+            SELECT updated.id IS NOT NULL, {columns}
+            FROM {link_table} LEFT JOIN updated ON updated.id = {link_table}.id
+            WHERE {link_table}.id = %s
+        """
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(sql, [user.id, link_id, link_id])
+            row = cursor.fetchone()
+
+        if row is None:
+            # The foreign key is only checked at commit, so a missing link inserts nothing rather than failing.
+            raise link_model.DoesNotExist(f'There is no link {link_id}.')
+        created, values = row[0], row[1:]
+        return link_model.from_db(self.db, [field.attname for field in link_fields], values), created
@@ -0,0 +1,58 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+SEARCH_VECTOR_TRIGGER = """
+CREATE FUNCTION links_link_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.description, '')), 'A') ||
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.url, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER links_link_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF url, description ON links_link
+    FOR EACH ROW EXECUTE PROCEDURE links_link_search_vector_update();
+
+UPDATE links_link SET url = url;
+"""
+
+DROP_SEARCH_VECTOR_TRIGGER = """
+DROP TRIGGER IF EXISTS links_link_search_vector_trigger ON links_link;
+DROP FUNCTION IF EXISTS links_link_search_vector_update();
+"""
+
+# Matches the SQL Django generates for `url__icontains`, so substring lookups can use the index.
+URL_TRIGRAM_INDEX = """
+CREATE INDEX links_link_url_trgm_idx ON links_link USING gin (UPPER(url::text) gin_trgm_ops);
+"""
+
+DROP_URL_TRIGRAM_INDEX = """
+DROP INDEX IF EXISTS links_link_url_trgm_idx;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0003_vote'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='link',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='link',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='links_link_search_idx'),
+        ),
+        migrations.RunSQL(SEARCH_VECTOR_TRIGGER, DROP_SEARCH_VECTOR_TRIGGER),
+        migrations.RunSQL(URL_TRIGRAM_INDEX, DROP_URL_TRIGRAM_INDEX),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+COUNT_VOTES = """
+UPDATE links_link SET vote_count = (
+    SELECT COUNT(*) FROM links_vote WHERE links_vote.link_id = links_link.id
+);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0004_link_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='link',
+            name='vote_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='link',
+            index=models.Index(fields=['-vote_count', '-id'], name='links_link_votes_idx'),
+        ),
+        migrations.RunSQL(COUNT_VOTES, migrations.RunSQL.noop),
+    ]
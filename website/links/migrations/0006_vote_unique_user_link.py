@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+DELETE_DUPLICATE_VOTES = """
+DELETE FROM links_vote duplicate USING links_vote original
+WHERE duplicate.user_id = original.user_id
+  AND duplicate.link_id = original.link_id
+  AND duplicate.id > original.id;
+"""
+
+COUNT_VOTES = """
+UPDATE links_link SET vote_count = (
+    SELECT COUNT(*) FROM links_vote WHERE links_vote.link_id = links_link.id
+);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('links', '0005_link_vote_count'),
+    ]
+
+    operations = [
+        migrations.RunSQL(DELETE_DUPLICATE_VOTES, migrations.RunSQL.noop),
+        migrations.RunSQL(COUNT_VOTES, migrations.RunSQL.noop),
+        migrations.AddConstraint(
+            model_name='vote',
+            constraint=models.UniqueConstraint(fields=('user', 'link'), name='links_vote_unique_user_link'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+from django.db import migrations, models
+
+from website.links.utils import canonicalize_url, url_hash
+
+
+def set_canonical_urls(apps, schema_editor):
+    """
+    Canonicalize the existing links. When several links share a canonical URL
+    only the oldest gets the hash, the duplicates keep a NULL one. Links were
+    not validated before, those whose URL can't be parsed keep an empty
+    canonical URL and a NULL hash too.
+    """
+    Link = apps.get_model('links', 'Link')
+    seen = set()
+    links = []
+    for link in Link.objects.only('id', 'url').order_by('id').iterator():
+        try:
+            link.canonical_url = canonicalize_url(link.url)
+        except ValueError:
+            continue
+        hashed = url_hash(link.canonical_url)
+        link.url_hash = None if hashed in seen else hashed
+        seen.add(hashed)
+        links.append(link)
+        if len(links) == 1000:
+            Link.objects.bulk_update(links, ['canonical_url', 'url_hash'])
+            links = []
+    Link.objects.bulk_update(links, ['canonical_url', 'url_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0008_link_created_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='link',
+            name='canonical_url',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='link',
+            name='url_hash',
+            field=models.CharField(editable=False, max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(set_canonical_urls, migrations.RunPython.noop),
+    ]
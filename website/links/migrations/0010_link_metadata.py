@@ -0,0 +1,45 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0009_link_canonical_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='link',
+            name='title',
+            field=models.CharField(blank=True, editable=False, max_length=300),
+        ),
+        migrations.AddField(
+            model_name='link',
+            name='site_name',
+            field=models.CharField(blank=True, editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='link',
+            name='image_url',
+            field=models.URLField(blank=True, editable=False, max_length=2000),
+        ),
+        migrations.AddField(
+            model_name='link',
+            name='fetched_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='link',
+            name='fetch_failures',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='link',
+            name='is_dead',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='link',
+            index=models.Index(fields=['fetched_at'], name='links_link_fetched_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+# Matches the SQL Django generates for `description__icontains`, like links_link_url_trgm_idx for the url.
+DESCRIPTION_TRIGRAM_INDEX = """
+CREATE INDEX links_link_description_trgm_idx ON links_link USING gin (UPPER(description::text) gin_trgm_ops);
+"""
+
+DROP_DESCRIPTION_TRIGRAM_INDEX = """
+DROP INDEX IF EXISTS links_link_description_trgm_idx;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0010_link_metadata'),
+    ]
+
+    operations = [
+        migrations.RunSQL(DESCRIPTION_TRIGRAM_INDEX, DROP_DESCRIPTION_TRIGRAM_INDEX),
+    ]
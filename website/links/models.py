@@ -1,13 +1,71 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from website.links.managers import LinkQuerySet, VoteQuerySet
+from website.links.utils import canonicalize_url, url_hash
 
 
 class Link(models.Model):
     url         = models.URLField()
     description = models.TextField(blank=True)
     posted_by   = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, on_delete=models.CASCADE)
+    created_at  = models.DateTimeField(default=timezone.now, db_index=True)
+
+    # Denormalized count of votes, kept up to date by CreateVote.
+    vote_count  = models.PositiveIntegerField(default=0)
+
+    # Maintained by a database trigger from url and description, see migration 0004.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    # Set from url by `set_canonical_url`, so every page can only be submitted once.
+    canonical_url = models.TextField(blank=True, editable=False)
+    url_hash      = models.CharField(max_length=64, unique=True, null=True, editable=False)
+
+    # Metadata of the page, fetched in the background by the unfurl_links task.
+    title       = models.CharField(max_length=300, blank=True, editable=False)
+    site_name   = models.CharField(max_length=200, blank=True, editable=False)
+    image_url   = models.URLField(max_length=2000, blank=True, editable=False)
+    fetched_at  = models.DateTimeField(null=True, editable=False)
+    # Number of fetches in a row that failed, the link is dead after LINK_UNFURL_DEAD_AFTER of them.
+    fetch_failures = models.PositiveSmallIntegerField(default=0, editable=False)
+    is_dead     = models.BooleanField(default=False, editable=False)
+
+    objects = LinkQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='links_link_search_idx'),
+            models.Index(fields=['-vote_count', '-id'], name='links_link_votes_idx'),
+            models.Index(fields=['fetched_at'], name='links_link_fetched_idx'),
+        ]
+
+    def set_canonical_url(self):
+        try:
+            self.canonical_url = canonicalize_url(self.url)
+        except ValueError as error:
+            raise ValidationError({'url': str(error)})
+        self.url_hash = url_hash(self.canonical_url)
+
+    def save(self, *args, **kwargs):
+        self.set_canonical_url()
+        super().save(*args, **kwargs)
 
 
 class Vote(models.Model):
     user = models.ForeignKey(to=settings.AUTH_USER_MODEL,   on_delete=models.CASCADE)
     link = models.ForeignKey(to=Link, related_name='votes', on_delete=models.CASCADE)
+
+    objects = VoteQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'link'], name='links_vote_unique_user_link'),
+        ]
+        indexes = [
+            models.Index(fields=['link', '-id'], name='links_vote_link_idx'),
+            models.Index(fields=['user', '-id'], name='links_vote_user_idx'),
+        ]
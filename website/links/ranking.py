@@ -0,0 +1,92 @@
+"""
+The "hot" front page ranking.
+
+Scores are kept in a Redis sorted set. Like on Reddit, a score grows with
+the log of the votes and with the time a link was posted rather than its age,
+so it never has to be recomputed as time passes and scores written at
+different times compare correctly. `update_link` and `update_links` set the
+score of links right after they are created or voted on, while
+`rank_hot_links` rebuilds the ranking of the links inside the ranking window
+on a schedule, dropping the ones that left it.
+"""
+import logging
+import math
+from datetime import timedelta
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+HOT_KEY = 'links:hot'
+
+
+@lru_cache(maxsize=None)
+def get_redis():
+    return redis.Redis.from_url(settings.REDIS_URL)
+
+
+def hot_score(vote_count, created_at):
+    """log10(votes + 1) + posted at in seconds / decay"""
+    return math.log10(max(vote_count, 0) + 1) + created_at.timestamp() / settings.HOT_RANKING_DECAY_SECONDS
+
+
+def window_start(now=None):
+    return (now or timezone.now()) - timedelta(days=settings.HOT_RANKING_WINDOW_DAYS)
+
+
+def rank_hot_links(links):
+    """
+    Rebuild the sorted set from `links`, an iterable of (id, vote_count, created_at).
+
+    The set is built under a temporary key and swapped in atomically, so
+    readers never see a partial ranking.
+    """
+    client = get_redis()
+    building_key = f'{HOT_KEY}:building'
+    client.delete(building_key)
+
+    count = 0
+    pipeline = client.pipeline(transaction=False)
+    for link_id, vote_count, created_at in links:
+        pipeline.zadd(building_key, {link_id: hot_score(vote_count, created_at)})
+        count += 1
+        if count % 1000 == 0:
+            pipeline.execute()
+    pipeline.zremrangebyrank(building_key, 0, -settings.HOT_RANKING_SIZE - 1)
+    pipeline.execute()
+
+    if count:
+        client.rename(building_key, HOT_KEY)
+    else:
+        client.delete(HOT_KEY)
+    return count
+
+
+def update_link(link):
+    """Move a single link to its current score, e.g. after a new vote."""
+    if link.created_at < window_start():
+        return
+    try:
+        get_redis().zadd(HOT_KEY, {link.id: hot_score(link.vote_count, link.created_at)})
+    except redis.RedisError:
+        logger.warning('Could not update the hot ranking of link %s', link.id, exc_info=True)
+
+
+def update_links(links):
+    """Like `update_link` for many links at once, in a single round trip."""
+    cutoff = window_start()
+    scores = {link.id: hot_score(link.vote_count, link.created_at) for link in links if link.created_at >= cutoff}
+    if not scores:
+        return
+    try:
+        get_redis().zadd(HOT_KEY, scores)
+    except redis.RedisError:
+        logger.warning('Could not update the hot ranking of %s links', len(scores), exc_info=True)
+
+
+def hot_link_ids(offset, count):
+    """Return a page of link ids from the hot ranking, best first."""
+    return [int(link_id) for link_id in get_redis().zrevrange(HOT_KEY, offset, offset + count - 1)]
@@ -1,9 +1,20 @@
-from django.db.models import Q
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 
 import graphene
+from rx import Observable
 from graphql import GraphQLError
 from graphene_django import DjangoObjectType
 
+from website.core.cache import invalidate_tags_on_commit
+from website.core.loaders import load_object, load_related
+from website.core.optimizer import optimize
+from website.core.pagination import connection_from_queryset
+from website.core.subscriptions import deserialize_instance, publish_on_commit, serialize_instance
+from website.links import ranking
+from website.links.tasks import unfurl_links_later
 from website.users.schema import UserType
 
 from .models import Link, Vote
@@ -12,31 +23,108 @@ from .models import Link, Vote
 class LinkType(DjangoObjectType):
     class Meta:
         model = Link
+        exclude_fields = ('search_vector', 'url_hash', 'fetch_failures')
+
+    def resolve_posted_by(self, info, **kwargs):
+        return load_object(info, self, 'posted_by')
+
+    def resolve_votes(self, info, **kwargs):
+        return load_related(info, self, 'votes')
 
 
 class VoteType(DjangoObjectType):
     class Meta:
         model = Vote
 
+    def resolve_user(self, info, **kwargs):
+        return load_object(info, self, 'user')
+
+    def resolve_link(self, info, **kwargs):
+        return load_object(info, self, 'link')
+
+
+class LinkConnection(graphene.relay.Connection):
+    class Meta:
+        node = LinkType
+
+
+class VoteConnection(graphene.relay.Connection):
+    class Meta:
+        node = VoteType
+
+
+class LinkOrder(graphene.Enum):
+    NEWEST = 'newest'
+    VOTES  = 'votes'
+    HOT    = 'hot'
+
+
+# Every ordering ends on the primary key so it is total, and is backed by an index.
+LINK_ORDERINGS = {
+    LinkOrder.NEWEST.value: ('-id',),
+    LinkOrder.VOTES.value:  ('-vote_count', '-id'),
+}
+
 
 class Query(graphene.ObjectType):
-    links = graphene.List(LinkType, search=graphene.String(), first=graphene.Int(), skip=graphene.Int())
+    links = graphene.List(
+        LinkType, search=graphene.String(), first=graphene.Int(), skip=graphene.Int(), order_by=LinkOrder()
+    )
+    links_connection = graphene.Field(
+        LinkConnection, first=graphene.Int(), after=graphene.String(), order_by=LinkOrder()
+    )
+    existing_link = graphene.Field(LinkType, url=graphene.String(required=True))
     votes = graphene.List(VoteType)
+    votes_connection = graphene.Field(
+        VoteConnection, first=graphene.Int(), after=graphene.String(), link_id=graphene.Int(), user_id=graphene.Int()
+    )
 
-    def resolve_links(self, info, search=None, first=None, skip=None, **kwargs):
-        queryset = Link.objects.all()
+    def resolve_links(self, info, search=None, first=None, skip=None, order_by=None, **kwargs):
+        if order_by == LinkOrder.HOT.value:
+            if search:
+                raise GraphQLError('Hot links can not be searched!')
+            return hot_links(skip or 0, min(first or settings.GRAPHQL_MAX_LIST_SIZE, settings.GRAPHQL_MAX_LIST_SIZE))
+
+        queryset = optimize(Link.objects.order_by('id'), info)
 
         if search:
-            queryset = Link.objects.filter(Q(url__icontains=search) | Q(description__icontains=search))
+            queryset = queryset.search(search)
+        if order_by:
+            queryset = queryset.order_by(*LINK_ORDERINGS[order_by])
         if skip:
             queryset = queryset[skip:]
-        if first:
-            queryset = queryset[:first]
 
-        return queryset
+        return queryset[:min(first or settings.GRAPHQL_MAX_LIST_SIZE, settings.GRAPHQL_MAX_LIST_SIZE)]
+
+    def resolve_links_connection(self, info, first=None, after=None, order_by=None, **kwargs):
+        if order_by == LinkOrder.HOT.value:
+            raise GraphQLError('Hot links can not be paginated by cursor, use links(orderBy: HOT) instead!')
+        ordering = LINK_ORDERINGS[order_by or LinkOrder.NEWEST.value]
+        queryset = optimize(Link.objects.all(), info, fields=[field.lstrip('-') for field in ordering])
+        return connection_from_queryset(LinkConnection, queryset, ordering, first, after)
+
+    def resolve_existing_link(self, info, url, **kwargs):
+        return Link.objects.existing(url)
 
     def resolve_votes(self, info, **kwargs):
-        return Vote.objects.all()
+        return optimize(Vote.objects.order_by('id'), info)[:settings.GRAPHQL_MAX_LIST_SIZE]
+
+    def resolve_votes_connection(self, info, first=None, after=None, link_id=None, user_id=None, **kwargs):
+        queryset = optimize(Vote.objects.all(), info)
+
+        if link_id is not None:
+            queryset = queryset.filter(link_id=link_id)
+        if user_id is not None:
+            queryset = queryset.filter(user_id=user_id)
+
+        return connection_from_queryset(VoteConnection, queryset, ('-id',), first, after)
+
+
+def hot_links(skip, first):
+    """Read a page of the hot ranking and hydrate the links in ranking order."""
+    ids = ranking.hot_link_ids(skip, first)
+    links = Link.objects.in_bulk(ids)
+    return [links[link_id] for link_id in ids if link_id in links]
 
 
 class CreateLink(graphene.Mutation):
@@ -52,7 +140,17 @@ class CreateLink(graphene.Mutation):
 
     def mutate(self, info, url, description):
         user = info.context.user
-        link = Link.objects.create(url=url, description=description, posted_by=user)
+        try:
+            with transaction.atomic():
+                link = Link.objects.create(url=url, description=description, posted_by=user)
+        except ValidationError as error:
+            raise GraphQLError('; '.join(error.messages))
+        except IntegrityError:
+            raise GraphQLError('This link was already submitted!')
+        unfurl_links_later([link.id])
+        invalidate_tags_on_commit('links')
+        publish_on_commit({'type': 'link.created', 'link': serialize_link(link)})
+        transaction.on_commit(lambda: ranking.update_link(link))
 
         return CreateLink(
             id=link.id,
@@ -62,9 +160,76 @@ class CreateLink(graphene.Mutation):
         )
 
 
+class LinkInput(graphene.InputObjectType):
+    url = graphene.String(required=True)
+    description = graphene.String()
+
+
+class LinkError(graphene.ObjectType):
+    """Why the link at `index` of the input was not created."""
+    index   = graphene.Int()
+    message = graphene.String()
+
+
+class CreateLinks(graphene.Mutation):
+    """Create many links in a single INSERT, links that fail validation are reported and skipped."""
+    ids    = graphene.List(graphene.Int, description='The id of each created link, or null, in input order.')
+    errors = graphene.List(LinkError)
+
+    class Arguments:
+        input = graphene.List(graphene.NonNull(LinkInput), required=True)
+
+    def mutate(self, info, input):
+        user = info.context.user
+        if user.is_anonymous:
+            raise GraphQLError('You must be logged in to create links!')
+        if len(input) > settings.GRAPHQL_MAX_BULK_CREATE_SIZE:
+            raise GraphQLError(f'At most {settings.GRAPHQL_MAX_BULK_CREATE_SIZE} links can be created at once!')
+
+        links, errors = [], []
+        for index, data in enumerate(input):
+            link = Link(url=data.url, description=data.description or '', posted_by=user)
+            try:
+                link.full_clean(exclude=['posted_by'], validate_unique=False)
+                link.set_canonical_url()
+            except ValidationError as error:
+                errors.append(LinkError(index=index, message='; '.join(error.messages)))
+                link = None
+            links.append(link)
+
+        # Drop the links submitted before, or more than once in this batch.
+        seen = set(
+            Link.objects.filter(url_hash__in=[link.url_hash for link in links if link])
+                .values_list('url_hash', flat=True)
+        )
+        for index, link in enumerate(links):
+            if link is None:
+                continue
+            if link.url_hash in seen:
+                errors.append(LinkError(index=index, message='This link was already submitted!'))
+                links[index] = None
+            seen.add(link.url_hash)
+        errors.sort(key=lambda error: error.index)
+
+        try:
+            with transaction.atomic():
+                created = Link.objects.bulk_create([link for link in links if link is not None])
+        except IntegrityError:
+            raise GraphQLError('Some of the links were submitted at the same time by someone else, try again!')
+        if created:
+            invalidate_tags_on_commit('links')
+            # One event for the whole batch instead of a round trip to the channel layer per link.
+            publish_on_commit({'type': 'links.created', 'links': [serialize_link(link) for link in created]})
+            transaction.on_commit(lambda: ranking.update_links(created))
+            unfurl_links_later([link.id for link in created])
+
+        return CreateLinks(ids=[link and link.id for link in links], errors=errors)
+
+
 class CreateVote(graphene.Mutation):
     user = graphene.Field(UserType)
     link = graphene.Field(LinkType)
+    created = graphene.Boolean(description='False if the user had already voted on the link.')
 
     class Arguments:
         link_id = graphene.Int()
@@ -74,14 +239,60 @@ class CreateVote(graphene.Mutation):
         if user.is_anonymous:
             raise GraphQLError('You must be logged to vote!')
 
-        link = Link.objects.filter(id=link_id).first()
-        if not link:
+        try:
+            link, created = Vote.objects.cast(user, link_id)
+        except Link.DoesNotExist:
             raise Exception('Invalid Link!')
 
-        Vote.objects.create(user=user, link=link)
-        return CreateVote(user=user, link=link)
+        if created:
+            invalidate_tags_on_commit('links', 'votes')
+            publish_on_commit({'type': 'link.voted', 'link': serialize_link(link)})
+            transaction.on_commit(lambda: ranking.update_link(link))
+
+        return CreateVote(user=user, link=link, created=created)
 
 
 class Mutation(graphene.ObjectType):
-    create_link = CreateLink.Field()
-    create_vote = CreateVote.Field()
+    create_link  = CreateLink.Field()
+    create_links = CreateLinks.Field()
+    create_vote  = CreateVote.Field()
+
+
+def serialize_link(link):
+    """
+    Serialize a link for the channel layer along with its poster, so that no
+    subscriber has to load the poster again for every event.
+    """
+    data = serialize_instance(link, exclude=('search_vector',))
+    data['posted_by'] = link.posted_by and serialize_instance(link.posted_by)
+    return data
+
+
+def deserialize_link(data):
+    """Rebuild a link made by `serialize_link`, with its poster already set."""
+    data = dict(data)
+    posted_by = data.pop('posted_by', None)
+    link = deserialize_instance(Link, data)
+    if posted_by is not None:
+        link.posted_by = deserialize_instance(get_user_model(), posted_by)
+    return link
+
+
+class Subscription(graphene.ObjectType):
+    """Resolvers receive the stream of published events as root, see GraphQLSubscriptionConsumer."""
+    link_created = graphene.Field(LinkType)
+    link_voted   = graphene.Field(LinkType, link_id=graphene.Int())
+
+    def resolve_link_created(self, info, **kwargs):
+        return (
+            self.filter(lambda event: event['type'] in ('link.created', 'links.created'))
+                .flat_map(lambda event: Observable.from_(event['links'] if 'links' in event else [event['link']]))
+                .map(deserialize_link)
+        )
+
+    def resolve_link_voted(self, info, link_id=None, **kwargs):
+        return (
+            self.filter(lambda event: event['type'] == 'link.voted')
+                .map(lambda event: deserialize_link(event['link']))
+                .filter(lambda link: link_id is None or link.id == link_id)
+        )
@@ -0,0 +1,83 @@
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from config import celery_app
+from website.links import ranking
+from website.links.models import Link
+from website.links.unfurl import fetch_pages
+
+
+@celery_app.task()
+def rank_hot_links():
+    """Recompute the hot ranking of every link inside the ranking window."""
+    links = (
+        Link.objects.filter(created_at__gte=ranking.window_start())
+                    .values_list('id', 'vote_count', 'created_at')
+                    .iterator()
+    )
+    return ranking.rank_hot_links(links)
+
+
+UNFURLED_FIELDS = ['title', 'site_name', 'image_url', 'fetched_at', 'fetch_failures', 'is_dead']
+
+
+@celery_app.task()
+def unfurl_links(link_ids):
+    """
+    Fetch the metadata of the pages of `link_ids` and store it on the links.
+
+    Links whose page was not fetched within LINK_UNFURL_DEADLINE are left as
+    they are, for `recheck_links` to pick up again.
+    """
+    # Every field bulk_update writes is loaded, a deferred one would be fetched with a query per link.
+    links = list(Link.objects.filter(id__in=link_ids).only('id', 'url', *UNFURLED_FIELDS))
+    pages = fetch_pages([link.url for link in links])
+
+    now = timezone.now()
+    fetched = []
+    for link, page in zip(links, pages):
+        if page is None:
+            continue
+        fetched.append(link)
+        link.fetched_at = now
+        if page.status is None or page.status >= 400:
+            link.fetch_failures += 1
+            link.is_dead = link.fetch_failures >= settings.LINK_UNFURL_DEAD_AFTER
+            continue
+
+        link.fetch_failures = 0
+        link.is_dead = False
+        if page.metadata:
+            link.title = page.metadata.get('title', '')[:Link._meta.get_field('title').max_length]
+            link.site_name = page.metadata.get('site_name', '')[:Link._meta.get_field('site_name').max_length]
+            image_url = page.metadata.get('image_url', '')
+            link.image_url = image_url if len(image_url) <= Link._meta.get_field('image_url').max_length else ''
+
+    Link.objects.bulk_update(fetched, UNFURLED_FIELDS)
+    return len(fetched)
+
+
+def unfurl_links_later(link_ids):
+    """Queue `unfurl_links` for `link_ids` in batches, once the current transaction commits."""
+    batch_size = settings.LINK_UNFURL_BATCH_SIZE
+    for start in range(0, len(link_ids), batch_size):
+        batch = link_ids[start:start + batch_size]
+        transaction.on_commit(partial(unfurl_links.delay, batch))
+
+
+@celery_app.task()
+def recheck_links():
+    """Fetch again the links that were never fetched or not for LINK_UNFURL_RECHECK_DAYS, dead ones included."""
+    stale = timezone.now() - timedelta(days=settings.LINK_UNFURL_RECHECK_DAYS)
+    link_ids = list(
+        Link.objects.filter(Q(fetched_at__isnull=True) | Q(fetched_at__lt=stale))
+                    .order_by(F('fetched_at').asc(nulls_first=True))
+                    .values_list('id', flat=True)[:settings.LINK_UNFURL_RECHECK_SIZE]
+    )
+    unfurl_links_later(link_ids)
+    return len(link_ids)
@@ -1,3 +1,420 @@
-from django.test import TestCase
+import ipaddress
+import json
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import StringIO
+from socketserver import ThreadingMixIn
 
-# Create your tests here.
+import pytest
+import redis
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from config.schema import schema
+from website.links import ranking, tasks
+from website.links.models import Link, Vote
+from website.links.ranking import hot_score
+from website.links.schema import deserialize_link, serialize_link
+from website.links.tasks import unfurl_links, unfurl_links_later
+from website.links.unfurl import fetch_pages, is_public
+from website.links.utils import canonicalize_url
+from website.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def execute(query, request, **variables):
+    result = schema.execute(query, context_value=request, variable_values=variables)
+    assert not result.errors, result.errors
+    return result.data
+
+
+@pytest.fixture
+def graphql_request(request_factory, user):
+    request = request_factory.post('/graphql/')
+    request.user = user
+    return request
+
+
+def test_links_batch_load_posted_by(graphql_request, django_assert_num_queries):
+    for user in UserFactory.create_batch(5):
+        Link.objects.create(url=f'https://example.com/{user.id}', posted_by=user)
+
+    with django_assert_num_queries(1):
+        data = execute('{ links { id postedBy { id } } }', graphql_request)
+
+    assert len(data['links']) == 5
+    assert all(link['postedBy'] for link in data['links'])
+
+
+def test_votes_batch_load_user_and_link(graphql_request, django_assert_num_queries):
+    for user in UserFactory.create_batch(3):
+        link = Link.objects.create(url=f'https://example.com/{user.id}', posted_by=user)
+        Vote.objects.create(user=user, link=link)
+
+    with django_assert_num_queries(2):
+        data = execute('{ votes { user { id } link { id votes { id } } } }', graphql_request)
+
+    assert len(data['votes']) == 3
+
+
+def test_links_connection_pages_by_cursor(graphql_request):
+    links = [Link.objects.create(url=f'https://example.com/{i}') for i in range(5)]
+    query = '''
+        query ($after: String) {
+            linksConnection(first: 2, after: $after) {
+                edges { cursor node { id } }
+                pageInfo { endCursor hasNextPage }
+            }
+        }
+    '''
+
+    seen, after = [], None
+    while True:
+        page = execute(query, graphql_request, after=after)['linksConnection']
+        seen += [int(edge['node']['id']) for edge in page['edges']]
+        if not page['pageInfo']['hasNextPage']:
+            break
+        after = page['pageInfo']['endCursor']
+
+    assert seen == [link.id for link in reversed(links)]
+
+
+def test_links_connection_rejects_invalid_cursor(graphql_request):
+    result = schema.execute('{ linksConnection(after: "nope") { edges { cursor } } }', context_value=graphql_request)
+    assert result.errors
+
+
+def test_links_search_ranks_matches(graphql_request):
+    Link.objects.create(url='https://example.com/', description='Unrelated')
+    docs = Link.objects.create(url='https://docs.djangoproject.com/', description='Django documentation')
+    blog = Link.objects.create(url='https://blog.example.com/django', description='A blog post')
+
+    data = execute('{ links(search: "djang") { id } }', graphql_request)
+
+    assert {int(link['id']) for link in data['links']} == {docs.id, blog.id}
+
+
+def test_links_search_matches_inside_description_words(graphql_request):
+    tips = Link.objects.create(url='https://example.com/', description='Pythonic tips')
+
+    data = execute('{ links(search: "thonic") { id } }', graphql_request)
+
+    assert [int(link['id']) for link in data['links']] == [tips.id]
+
+
+def test_create_vote_increments_vote_count(graphql_request):
+    link = Link.objects.create(url='https://example.com/')
+
+    data = execute(
+        'mutation ($id: Int) { createVote(linkId: $id) { link { voteCount } } }', graphql_request, id=link.id,
+    )
+
+    assert data['createVote']['link']['voteCount'] == 1
+    link.refresh_from_db()
+    assert link.vote_count == 1
+
+
+def test_links_order_by_votes(graphql_request):
+    quiet = Link.objects.create(url='https://example.com/quiet')
+    popular = Link.objects.create(url='https://example.com/popular', vote_count=3)
+
+    data = execute('{ links(orderBy: VOTES) { id } }', graphql_request)
+
+    assert [int(link['id']) for link in data['links']] == [popular.id, quiet.id]
+
+
+def test_rebuild_vote_counts(user):
+    link = Link.objects.create(url='https://example.com/', vote_count=42)
+    Vote.objects.create(user=user, link=link)
+
+    call_command('rebuild_vote_counts', stdout=StringIO())
+
+    link.refresh_from_db()
+    assert link.vote_count == 1
+
+
+def test_benchmark_graphql_runs_every_operation():
+    output = StringIO()
+
+    call_command('benchmark_graphql', links=50, users=5, repeat=1, stdout=output, stderr=StringIO())
+
+    results = json.loads(output.getvalue())['results']
+    assert {name: result['errors'] for name, result in results.items()} == {name: [] for name in results}
+    assert not Link.objects.exists()
+
+
+def test_create_vote_is_idempotent(graphql_request):
+    link = Link.objects.create(url='https://example.com/')
+    mutation = 'mutation ($id: Int) { createVote(linkId: $id) { created } }'
+
+    assert execute(mutation, graphql_request, id=link.id)['createVote']['created'] is True
+    assert execute(mutation, graphql_request, id=link.id)['createVote']['created'] is False
+
+    link.refresh_from_db()
+    assert link.vote_count == 1
+    assert Vote.objects.filter(link=link).count() == 1
+
+
+def test_create_vote_on_missing_link(graphql_request):
+    result = schema.execute('mutation { createVote(linkId: 0) { created } }', context_value=graphql_request)
+    assert [error.message for error in result.errors] == ['Invalid Link!']
+    assert not Vote.objects.exists()
+
+
+def test_votes_connection_filters_by_link(graphql_request, user):
+    links = [Link.objects.create(url=f'https://example.com/{i}') for i in range(2)]
+    vote = Vote.objects.create(user=user, link=links[0])
+    Vote.objects.create(user=user, link=links[1])
+
+    data = execute(
+        'query ($link: Int) { votesConnection(linkId: $link) { edges { node { id } } } }',
+        graphql_request, link=links[0].id,
+    )
+
+    assert [int(edge['node']['id']) for edge in data['votesConnection']['edges']] == [vote.id]
+
+
+def test_link_serialization_round_trip(user):
+    link = Link.objects.create(url='https://example.com/', description='Example', posted_by=user, vote_count=2)
+
+    copy = deserialize_link(serialize_link(link))
+
+    assert (copy.id, copy.url, copy.description, copy.posted_by_id, copy.vote_count) == \
+        (link.id, link.url, link.description, user.id, 2)
+    assert Link.posted_by.is_cached(copy)
+    assert (copy.posted_by.id, copy.posted_by.email) == (user.id, user.email)
+
+
+def test_hot_score_favours_newer_links():
+    now = timezone.now()
+
+    fresh = hot_score(5, now - timedelta(hours=1))
+    old = hot_score(5, now - timedelta(days=2))
+    popular_old = hot_score(500, now - timedelta(days=2))
+
+    assert fresh > old
+    assert popular_old > old
+
+
+@pytest.fixture
+def hot_ranking():
+    try:
+        ranking.get_redis().delete(ranking.HOT_KEY)
+    except redis.ConnectionError:
+        pytest.skip('Redis is not available')
+    yield
+    ranking.get_redis().delete(ranking.HOT_KEY)
+
+
+def test_links_order_by_hot(graphql_request, hot_ranking):
+    now = timezone.now()
+    old = Link.objects.create(url='https://example.com/old', vote_count=5, created_at=now - timedelta(days=1))
+    new = Link.objects.create(url='https://example.com/new', created_at=now)
+    popular = Link.objects.create(url='https://example.com/popular', vote_count=10, created_at=now)
+    tasks.rank_hot_links()
+
+    data = execute('{ links(orderBy: HOT) { id } }', graphql_request)
+    assert [int(link['id']) for link in data['links']] == [popular.id, new.id, old.id]
+
+    old.vote_count = 1000
+    ranking.update_link(old)
+
+    data = execute('{ links(orderBy: HOT, first: 1) { id } }', graphql_request)
+    assert [int(link['id']) for link in data['links']] == [old.id]
+
+
+def test_create_links_reports_invalid_items(graphql_request):
+    data = execute(
+        'mutation ($input: [LinkInput!]!) { createLinks(input: $input) { ids errors { index message } } }',
+        graphql_request,
+        input=[{'url': 'https://example.com/a'}, {'url': 'not a url'}, {'url': 'https://example.com/b'}],
+    )['createLinks']
+
+    links = Link.objects.order_by('id')
+    assert data['ids'] == [links[0].id, None, links[1].id]
+    assert [error['index'] for error in data['errors']] == [1]
+
+
+def test_create_links_requires_login(graphql_request):
+    graphql_request.user = AnonymousUser()
+
+    result = schema.execute(
+        'mutation { createLinks(input: [{url: "https://example.com/"}]) { ids } }', context_value=graphql_request,
+    )
+
+    assert [error.message for error in result.errors] == ['You must be logged in to create links!']
+    assert not Link.objects.exists()
+
+
+def test_create_links_reports_invalid_ports(graphql_request):
+    data = execute(
+        'mutation ($input: [LinkInput!]!) { createLinks(input: $input) { ids errors { index } } }',
+        graphql_request,
+        input=[{'url': 'https://example.com:99999/'}, {'url': 'https://example.com/'}],
+    )['createLinks']
+
+    assert data['ids'] == [None, Link.objects.get().id]
+    assert [error['index'] for error in data['errors']] == [0]
+
+
+def test_create_link_rejects_invalid_port(graphql_request):
+    result = schema.execute(
+        'mutation { createLink(url: "https://example.com:99999/", description: "") { id } }',
+        context_value=graphql_request,
+    )
+
+    assert [error.message for error in result.errors] == ['Port out of range 0-65535']
+    assert not Link.objects.exists()
+
+
+def test_canonicalize_url():
+    assert canonicalize_url('HTTPS://Example.COM:443/path/?utm_source=x&b=2&a=1#top') == \
+        'https://example.com/path?a=1&b=2'
+    assert canonicalize_url('http://example.com') == canonicalize_url('http://example.com/')
+
+
+def test_canonicalize_url_keeps_ipv6_brackets():
+    assert canonicalize_url('http://[::1]:8080/') == 'http://[::1]:8080/'
+    assert canonicalize_url('http://[::1:8080]/') == 'http://[::1:8080]/'
+
+
+def test_existing_link_matches_canonical_url(graphql_request):
+    link = Link.objects.create(url='https://example.com/page/?utm_campaign=news')
+
+    data = execute(
+        'query ($url: String!) { existingLink(url: $url) { id } }', graphql_request, url='https://EXAMPLE.com/page',
+    )
+
+    assert int(data['existingLink']['id']) == link.id
+
+
+def test_create_links_skips_duplicates(graphql_request):
+    Link.objects.create(url='https://example.com/a')
+
+    data = execute(
+        'mutation ($input: [LinkInput!]!) { createLinks(input: $input) { ids errors { index } } }',
+        graphql_request,
+        input=[{'url': 'https://example.com/a/'}, {'url': 'https://example.com/b'}, {'url': 'https://example.com/b#x'}],
+    )['createLinks']
+
+    assert data['ids'][0] is None and data['ids'][2] is None
+    assert [error['index'] for error in data['errors']] == [0, 2]
+
+
+class StubPageHandler(BaseHTTPRequestHandler):
+    PAGE = (
+        b'<html><head><title>Fallback</title>'
+        b'<meta property="og:title" content="Example title">'
+        b'<meta property="og:site_name" content="Example">'
+        b'<meta property="og:image" content="https://example.com/image.png">'
+        b'</head><body></body></html>'
+    )
+
+    def do_GET(self):
+        if self.path == '/slow':
+            time.sleep(1)
+        if self.path != '/page':
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(self.PAGE)))
+        self.end_headers()
+        self.wfile.write(self.PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    # A slow page must not hold up the others.
+    daemon_threads = True
+
+
+@pytest.fixture
+def stub_server(settings):
+    settings.LINK_UNFURL_ALLOWED_NETWORKS = ['127.0.0.1/32']
+    server = StubServer(('127.0.0.1', 0), StubPageHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_pages_parses_metadata(stub_server):
+    page, missing = fetch_pages([f'{stub_server}/page', f'{stub_server}/missing'])
+
+    assert page.metadata == {
+        'title': 'Example title', 'site_name': 'Example', 'image_url': 'https://example.com/image.png',
+    }
+    assert (missing.status, missing.metadata) == (404, None)
+
+
+def test_fetch_pages_gives_up_at_the_deadline(stub_server):
+    page, slow = fetch_pages([f'{stub_server}/page', f'{stub_server}/slow'], deadline=0.5)
+
+    assert page.status == 200
+    assert slow is None
+
+
+def test_fetch_pages_refuses_private_addresses(stub_server, settings):
+    settings.LINK_UNFURL_ALLOWED_NETWORKS = []
+
+    page, = fetch_pages([f'{stub_server}/page'])
+
+    assert (page.status, page.metadata) == (None, None)
+
+
+def test_is_public():
+    assert is_public('93.184.216.34', [])
+    for address in ('127.0.0.1', '10.1.2.3', '169.254.169.254', '::1', '::ffff:192.168.0.1', '0.0.0.0'):
+        assert not is_public(address, []), address
+    assert is_public('10.1.2.3', [ipaddress.ip_network('10.0.0.0/8')])
+
+
+def test_unfurl_links_marks_dead_links(stub_server, settings):
+    settings.LINK_UNFURL_DEAD_AFTER = 1
+    page = Link.objects.create(url=f'{stub_server}/page')
+    missing = Link.objects.create(url=f'{stub_server}/missing')
+
+    with CaptureQueriesContext(connection) as queries:
+        unfurl_links([page.id, missing.id])
+    # The links are loaded and saved with one query each, whatever the pages held.
+    assert len(queries) == 2
+
+    page.refresh_from_db()
+    missing.refresh_from_db()
+    assert (page.title, page.is_dead) == ('Example title', False)
+    assert missing.is_dead and missing.fetched_at
+
+
+def test_unfurl_links_later_queues_every_batch(settings, monkeypatch):
+    settings.LINK_UNFURL_BATCH_SIZE = 1
+    callbacks, queued = [], []
+    monkeypatch.setattr(tasks.transaction, 'on_commit', callbacks.append)
+    monkeypatch.setattr(tasks.unfurl_links, 'delay', queued.append)
+
+    unfurl_links_later([1, 2])
+    for callback in callbacks:
+        callback()
+
+    assert queued == [[1], [2]]
+
+
+def test_links_load_only_selected_columns(graphql_request, user):
+    Link.objects.create(url='https://example.com/', description='Example', posted_by=user)
+
+    with CaptureQueriesContext(connection) as queries:
+        data = execute('{ links { url postedBy { email } } }', graphql_request)
+
+    assert data['links'] == [{'url': 'https://example.com/', 'postedBy': {'email': user.email}}]
+    assert len(queries) == 1
+    assert '"description"' not in queries[0]['sql']
+    assert '"password"' not in queries[0]['sql']
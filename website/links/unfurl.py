@@ -0,0 +1,209 @@
+"""
+Fetch the title, site name and preview image of links.
+
+Pages are fetched concurrently on an asyncio event loop with aiohttp, through
+one connection pool so connections to the same host are reused. Every fetch
+is bounded by a timeout and only the first LINK_UNFURL_MAX_BYTES of a page
+are read, which is plenty for the <head>. Whatever is still being fetched
+after LINK_UNFURL_DEADLINE seconds is given up, so a batch of slow pages
+can't run a task into its time limit.
+
+Links are submitted by anyone, so pages, redirects included, are only
+fetched from public addresses and never from the internal network.
+"""
+import asyncio
+import ipaddress
+import socket
+from collections import namedtuple
+from html.parser import HTMLParser
+
+import aiohttp
+from aiohttp.abc import AbstractResolver
+from aiohttp.resolver import DefaultResolver
+from django.conf import settings
+from yarl import URL
+
+USER_AGENT = 'Mozilla/5.0 (compatible; LinkUnfurler/1.0)'
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+
+# `status` is the HTTP status, or None if the page could not be reached at all.
+Page = namedtuple('Page', ['url', 'status', 'metadata'])
+
+
+class MetadataParser(HTMLParser):
+    """Collect the <title> and the OpenGraph / Twitter card meta tags of a page."""
+
+    PROPERTIES = {
+        'og:title': 'title',
+        'twitter:title': 'title',
+        'og:site_name': 'site_name',
+        'og:image': 'image_url',
+        'og:image:url': 'image_url',
+        'twitter:image': 'image_url',
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.metadata = {}
+        self.title = ''
+        self.in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'title':
+            self.in_title = True
+        elif tag == 'meta':
+            attrs = dict(attrs)
+            key = self.PROPERTIES.get((attrs.get('property') or attrs.get('name') or '').lower())
+            if key and attrs.get('content') and key not in self.metadata:
+                self.metadata[key] = attrs['content'].strip()
+
+    def handle_endtag(self, tag):
+        if tag == 'title':
+            self.in_title = False
+
+    def handle_data(self, data):
+        if self.in_title:
+            self.title += data
+
+    def result(self):
+        metadata = dict(self.metadata)
+        metadata.setdefault('title', ' '.join(self.title.split()))
+        return metadata
+
+
+def parse_metadata(html):
+    parser = MetadataParser()
+    parser.feed(html)
+    parser.close()
+    return parser.result()
+
+
+def allowed_networks():
+    return [ipaddress.ip_network(network) for network in settings.LINK_UNFURL_ALLOWED_NETWORKS]
+
+
+def is_public(address, allowed):
+    """Whether the IP `address` may be fetched from: a public address, or one inside `allowed`."""
+    address = ipaddress.ip_address(address)
+    if any(address in network for network in allowed):
+        return True
+    if address.version == 6 and address.ipv4_mapped:
+        address = address.ipv4_mapped
+    return not (
+        address.is_private or address.is_loopback or address.is_link_local
+        or address.is_reserved or address.is_multicast or address.is_unspecified
+    )
+
+
+class PublicResolver(AbstractResolver):
+    """Resolve host names like aiohttp does, dropping the addresses that are not public."""
+
+    def __init__(self, allowed):
+        self.resolver = DefaultResolver()
+        self.allowed = allowed
+
+    async def resolve(self, host, port=0, family=socket.AF_INET):
+        hosts = await self.resolver.resolve(host, port, family)
+        hosts = [info for info in hosts if is_public(info['host'], self.allowed)]
+        if not hosts:
+            # The connector turns this into a ClientConnectorError.
+            raise OSError(f'{host} has no public address')
+        return hosts
+
+    async def close(self):
+        await self.resolver.close()
+
+
+async def get(session, url, allowed):
+    """
+    GET `url`, following redirects by hand.
+
+    The connector resolves host names through PublicResolver, but skips it for
+    urls that already hold an IP address, so those are checked here, at every hop.
+    """
+    url = URL(url)
+    for _ in range(MAX_REDIRECTS + 1):
+        try:
+            literal = ipaddress.ip_address(url.raw_host or '')
+        except ValueError:
+            pass
+        else:
+            if not is_public(literal, allowed):
+                raise aiohttp.ClientConnectionError(f'{literal} is not a public address')
+
+        response = await session.get(url, allow_redirects=False)
+        location = response.headers.get('Location')
+        if response.status not in REDIRECT_STATUSES or not location:
+            return response
+        response.release()
+        url = url.join(URL(location))
+
+    raise aiohttp.ClientError(f'More than {MAX_REDIRECTS} redirects')
+
+
+async def read_head(response, max_bytes):
+    """Read at most `max_bytes` of the body, never the rest of a huge page."""
+    body = b''
+    while len(body) < max_bytes:
+        chunk = await response.content.read(max_bytes - len(body))
+        if not chunk:
+            break
+        body += chunk
+    return body
+
+
+async def read_page(session, url, allowed):
+    response = await get(session, url, allowed)
+    try:
+        if response.status != 200 or response.content_type != 'text/html':
+            return Page(url, response.status, None)
+        body = await read_head(response, settings.LINK_UNFURL_MAX_BYTES)
+        html = body.decode(response.charset or 'utf-8', errors='replace')
+        return Page(url, response.status, parse_metadata(html))
+    finally:
+        response.release()
+
+
+async def fetch_page(session, semaphore, url, allowed):
+    async with semaphore:
+        try:
+            # The session timeout applies to every redirect, this one to the page as a whole.
+            return await asyncio.wait_for(read_page(session, url, allowed), settings.LINK_UNFURL_TIMEOUT)
+        except (aiohttp.ClientError, asyncio.TimeoutError, UnicodeError, LookupError, ValueError):
+            return Page(url, None, None)
+
+
+async def fetch_pages_async(urls, deadline):
+    allowed = allowed_networks()
+    semaphore = asyncio.Semaphore(settings.LINK_UNFURL_CONCURRENCY)
+    connector = aiohttp.TCPConnector(
+        limit=settings.LINK_UNFURL_CONCURRENCY, limit_per_host=4, resolver=PublicResolver(allowed),
+    )
+    timeout = aiohttp.ClientTimeout(total=settings.LINK_UNFURL_TIMEOUT)
+    headers = {'User-Agent': USER_AGENT}
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+        fetches = [asyncio.ensure_future(fetch_page(session, semaphore, url, allowed)) for url in urls]
+        if not fetches:
+            return []
+        done, pending = await asyncio.wait(fetches, timeout=deadline)
+        for fetch in pending:
+            fetch.cancel()
+        # Let the cancelled fetches release their connections before the session closes.
+        await asyncio.gather(*pending, return_exceptions=True)
+        return [fetch.result() if fetch in done else None for fetch in fetches]
+
+
+def fetch_pages(urls, deadline=None):
+    """
+    Fetch `urls` concurrently and return a Page for each of them, in order.
+
+    The Page of a url is None if it was not fetched within `deadline` seconds,
+    LINK_UNFURL_DEADLINE by default.
+    """
+    deadline = settings.LINK_UNFURL_DEADLINE if deadline is None else deadline
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(fetch_pages_async(urls, deadline))
+    finally:
+        loop.close()
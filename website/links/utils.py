@@ -0,0 +1,44 @@
+import hashlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track where a visitor came from and never change the page.
+TRACKING_PARAMS = {'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', 'igshid', 'ref', 'ref_src'}
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def canonicalize_url(url):
+    """
+    Normalize a URL so that every spelling of the same page compares equal.
+
+    The scheme and host are lowercased, default ports, fragments, trailing
+    slashes and tracking parameters are dropped and the remaining query
+    parameters are sorted. Raises ValueError for a URL that can't be split,
+    e.g. with a port out of range.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+
+    host = (parts.hostname or '').rstrip('.')
+    if ':' in host:
+        # hostname drops the brackets of an IPv6 address, which keep it apart from the port.
+        host = f'[{host}]'
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f'{host}:{parts.port}'
+    if parts.username:
+        credentials = parts.username + (f':{parts.password}' if parts.password else '')
+        host = f'{credentials}@{host}'
+
+    path = parts.path.rstrip('/') or '/'
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+    )
+
+    return urlunsplit((scheme, host, path, urlencode(query), ''))
+
+
+def url_hash(canonical_url):
+    """Fixed width key of a canonical URL, so the unique index stays small whatever the URL length."""
+    return hashlib.sha256(canonical_url.encode()).hexdigest()
@@ -7,7 +7,5 @@ class UsersConfig(AppConfig):
     verbose_name = _("Users")
 
     def ready(self):
-        try:
-            import website.users.signals  # noqa F401
-        except ImportError:
-            pass
+        # The signals keep the cached users of CachedJSONWebTokenBackend fresh, failing to import them must not pass.
+        import website.users.signals  # noqa F401
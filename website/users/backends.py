@@ -0,0 +1,121 @@
+import copy
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+
+from graphql_jwt.backends import JSONWebTokenBackend
+from graphql_jwt.exceptions import GraphQLJWTError
+from graphql_jwt.utils import get_authorization_header, get_payload
+
+from website.core.cache import LRUCache
+from website.users.hashers import HashingBusy, hashing_slot
+
+# Users of recently seen tokens by natural key, trusted for JWT_USER_CACHE_TTL seconds.
+local_users = LRUCache(settings.JWT_USER_CACHE_SIZE, ttl=settings.JWT_USER_CACHE_TTL)
+
+
+def user_version(user_id):
+    """The version stamp of a user, changed every time the user is saved or deleted."""
+    key = f'user-version:{user_id}'
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key)
+    return version
+
+
+def invalidate_user(user):
+    """
+    Make every process load `user` again, leaving the other cached users alone.
+
+    The local cache of other processes, and an entry under a natural key the
+    user no longer has, are trusted until JWT_USER_CACHE_TTL runs out either way.
+    """
+    cache.set(f'user-version:{user.pk}', uuid.uuid4().hex, timeout=None)
+    local_users.delete(user.get_username())
+
+
+def get_user_by_natural_key(username):
+    UserModel = get_user_model()
+    try:
+        return UserModel._default_manager.get_by_natural_key(username)
+    except UserModel.DoesNotExist:
+        return None
+
+
+def get_cached_user(username):
+    """
+    Load the user with the natural key `username`, going through two caches.
+
+    The process local cache is trusted for a few seconds, then the user is
+    read from the shared cache where it is stored along with the version stamp
+    of the user it was cached with. Only if that version changed since, the
+    user is loaded from the database again.
+    """
+    user = local_users.get(username)
+    if user is not None:
+        return user
+
+    key = f'jwt-user:{username}'
+    cached = cache.get(key)
+    if cached is not None:
+        version, user = cached
+        if version == user_version(user.pk):
+            local_users.set(username, user)
+            return user
+
+    user = get_user_by_natural_key(username)
+    if user is not None:
+        cache.set(key, (user_version(user.pk), user), timeout=settings.JWT_USER_CACHE_TIMEOUT)
+        local_users.set(username, user)
+    return user
+
+
+class CachedJSONWebTokenBackend(JSONWebTokenBackend):
+    """JSONWebTokenBackend resolving the user of a token without a query for every request."""
+
+    def authenticate(self, request=None, **credentials):
+        if request is None:
+            return None
+
+        token = get_authorization_header(request)
+        if token is None:
+            return None
+
+        # Raises GraphQLJWTError for invalid and expired tokens, which JSONWebTokenMiddleware turns into a 401.
+        payload = get_payload(token)
+        username = payload.get(get_user_model().USERNAME_FIELD)
+        if not username:
+            raise GraphQLJWTError('Invalid payload')
+
+        user = get_cached_user(username)
+        if user is not None and not user.is_active:
+            raise GraphQLJWTError('User is disabled')
+
+        # The cached instance is shared between requests, hand out a copy.
+        return copy.copy(user)
+
+
+class BoundedModelBackend(ModelBackend):
+    """
+    ModelBackend hashing the password only while holding one of the shared hashing slots.
+
+    When none is free the login is denied, and the error is left on the
+    request as `_hashing_busy` so the caller can tell the client to retry.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if password is None:
+            return None
+        try:
+            with hashing_slot():
+                return super().authenticate(request, username=username, password=password, **kwargs)
+        except HashingBusy as error:
+            if request is not None:
+                request._hashing_busy = error
+            raise PermissionDenied(str(error))
@@ -0,0 +1,88 @@
+import json
+import logging
+import uuid
+from contextlib import contextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+HASHING_SLOT_KEY = 'password-hashing-slot'
+
+
+class HashingBusy(Exception):
+    """Raised when PASSWORD_HASHING_CONCURRENCY hashes are already being computed."""
+
+
+@lru_cache(maxsize=None)
+def load_profile(path):
+    """Read the parameters written by the calibrate_password_hasher command, once per process."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+class CalibratedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2 with the parameters measured on the host by calibrate_password_hasher.
+
+    The algorithm name is unchanged, so existing hashes still verify, and
+    since `must_update` compares their parameters with these, they are
+    rehashed on the next successful login after a new calibration.
+    """
+
+    @property
+    def profile(self):
+        return load_profile(settings.PASSWORD_HASHER_PROFILE)
+
+    @property
+    def time_cost(self):
+        return self.profile.get('time_cost', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return self.profile.get('memory_cost', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return self.profile.get('parallelism', Argon2PasswordHasher.parallelism)
+
+
+@contextmanager
+def hashing_slot():
+    """
+    Hold one of the PASSWORD_HASHING_CONCURRENCY slots shared by every worker while hashing a password.
+
+    When all of them are taken, raise HashingBusy right away instead of
+    queueing, so a burst of sign ups or logins can't tie up every worker.
+    Every slot is a key of its own, claimed with `cache.add`, which expires
+    in case a worker dies while holding it and takes only that slot along.
+
+    If the cache can't be reached the hash runs without a slot, an outage of
+    the cache must not lock everybody out.
+    """
+    holder = uuid.uuid4().hex
+    key = None
+    for slot in range(settings.PASSWORD_HASHING_CONCURRENCY):
+        claimed = cache.add(f'{HASHING_SLOT_KEY}:{slot}', holder, timeout=settings.PASSWORD_HASHING_SLOT_TIMEOUT)
+        if claimed is None:
+            # django_redis returns None instead of raising with IGNORE_EXCEPTIONS, a taken slot is False.
+            logger.warning('Could not claim a password hashing slot, hashing without a limit')
+            break
+        if claimed:
+            key = f'{HASHING_SLOT_KEY}:{slot}'
+            break
+    else:
+        raise HashingBusy('Too many passwords are being hashed, try again later!')
+
+    try:
+        yield
+    finally:
+        # The slot may have expired and been claimed by someone else meanwhile.
+        if key is not None and cache.get(key) == holder:
+            cache.delete(key)
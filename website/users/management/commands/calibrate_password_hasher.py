@@ -0,0 +1,81 @@
+import json
+import os
+import statistics
+import time
+
+from argon2.low_level import ARGON2_VERSION, Type, hash_secret
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+def measure(time_cost, memory_cost, parallelism, rounds):
+    """Median duration in milliseconds of hashing a password with the given Argon2 parameters."""
+    durations = []
+    for _ in range(rounds):
+        salt = os.urandom(16)
+        started = time.perf_counter()
+        hash_secret(b'calibration password', salt, time_cost, memory_cost, parallelism, 16, Type.I)
+        durations.append((time.perf_counter() - started) * 1000)
+    return statistics.median(durations)
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure Argon2 on this host and write the strongest parameters that hash a password '
+        'within the target duration and memory budget to PASSWORD_HASHER_PROFILE.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target-ms', type=float, default=250, help='Longest acceptable time to hash a password.')
+        parser.add_argument('--max-memory', type=int, default=64 * 1024, help='Memory budget of a single hash in KiB.')
+        parser.add_argument('--parallelism', type=int, default=2, help='Number of threads used by a single hash.')
+        parser.add_argument('--rounds', type=int, default=5, help='Number of hashes measured for each candidate.')
+        parser.add_argument('--max-time-cost', type=int, default=16)
+        parser.add_argument('--output', default=settings.PASSWORD_HASHER_PROFILE)
+        parser.add_argument('--dry-run', action='store_true', help='Only print the profile.')
+
+    def handle(self, *args, target_ms, max_memory, parallelism, rounds, max_time_cost, output, dry_run, **options):
+        # Argon2 needs at least 8 KiB per lane, try 8 MiB, 16 MiB, ... up to the budget.
+        memory_costs = []
+        memory_cost = 8 * 1024
+        while memory_cost <= max_memory:
+            memory_costs.append(memory_cost)
+            memory_cost *= 2
+
+        best = None
+        for memory_cost in memory_costs:
+            for time_cost in range(1, max_time_cost + 1):
+                duration = measure(time_cost, memory_cost, parallelism, rounds)
+                self.stderr.write(f'time_cost={time_cost} memory_cost={memory_cost} KiB: {duration:.1f} ms')
+                if duration > target_ms:
+                    break
+                # More memory makes GPU attacks harder than more passes, so it wins over time.
+                best = {'time_cost': time_cost, 'memory_cost': memory_cost, 'duration_ms': round(duration, 1)}
+
+        if best is None:
+            self.stderr.write(self.style.ERROR(
+                f'Not even the cheapest parameters hash a password within {target_ms} ms.'
+            ))
+            return
+
+        profile = {
+            'time_cost': best['time_cost'],
+            'memory_cost': best['memory_cost'],
+            'parallelism': parallelism,
+            'version': ARGON2_VERSION,
+            'target_ms': target_ms,
+            'measured_ms': best['duration_ms'],
+            'calibrated_at': timezone.now().isoformat(),
+        }
+        data = json.dumps(profile, indent=2)
+
+        if dry_run:
+            self.stdout.write(data)
+            return
+
+        with open(output, 'w') as f:
+            f.write(data)
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {output}, existing hashes are upgraded on the next login once the workers are restarted.'
+        ))
@@ -1,14 +1,17 @@
+import hashlib
 import uuid
 
 from django.conf import settings
 from django.contrib.auth.models import PermissionsMixin
 from django.contrib.auth.base_user import AbstractBaseUser
 from django.core import signing
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.mail import send_mail
-from django.db.models import BooleanField, CharField, DateTimeField, EmailField, UUIDField
+from django.db.models import BooleanField, CharField, DateTimeField, EmailField, Index, UUIDField
 
 from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
 from django.utils.translation import ugettext_lazy as _
 
 from website.users.managers import CustomUserManager
@@ -72,13 +75,20 @@ class User(AbstractUser):
     name = CharField(_("Name of User"), blank=True, max_length=255)
     uid = UUIDField(default=uuid.uuid4, help_text=_('Unique ID for this model'))
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            Index(fields=['-date_joined', '-id'], name='users_user_joined_idx'),
+        ]
+
 
 class OneTimeToken:
     """
-    A token that can be used to login directly to the site, as long as check_payload is valid.
+    A token that can be used to login directly to the site, once.
 
-    Once check_payload returns False, in this case when the payouts are accepted, it can no longer
-    be used.
+    The signed payload holds the user id and a stamp of the user's password
+    hash, so a token stops working once the password changes. Tokens that
+    have been used are remembered in the cache until they would have expired
+    anyway. Forged, expired and replayed tokens are rejected without a query.
     """
 
     expire_days = settings.ONE_TIME_TOKEN_EXPIRE_DAYS
@@ -87,37 +97,54 @@ class OneTimeToken:
     def __init__(self, user):
         self.user = user
 
+    @classmethod
+    def max_age(cls):
+        return int(60 * 60 * 24 * cls.expire_days)
+
     @classmethod
     def from_key(cls, key):
         """
-        Recreate a OneTimeToken from its key.
+        Recreate a OneTimeToken from its key, and mark the key as used.
 
         If the signing is invalid, it has expired or already been
         used: raise Object.DoesNotExist.
         """
         try:
-            max_age = (
-                    60 * 60 * 24 * cls.expire_days
-            )
-            user_id = signing.loads(
-                key, max_age=max_age,
-                salt=settings.ONE_TIME_TOKEN_SALT
-            )
+            user_id, stamp = signing.loads(key, max_age=cls.max_age(), salt=settings.ONE_TIME_TOKEN_SALT)
+        except (signing.BadSignature, TypeError, ValueError):
+            raise cls.DoesNotExist
+
+        used_key = cls.used_key(key)
+        if cache.get(used_key) is not None:
+            raise cls.DoesNotExist
+
+        try:
             user = cls.check_user(user_id)
-        except (signing.SignatureExpired,
-                signing.BadSignature,
-                ObjectDoesNotExist):
+        except ObjectDoesNotExist:
             raise cls.DoesNotExist
-        else:
-            return OneTimeToken(user)
+
+        if not constant_time_compare(stamp, cls.stamp(user)):
+            raise cls.DoesNotExist
+        # Only one of two concurrent uses of the same key gets to add it.
+        if not cache.add(used_key, True, timeout=cls.max_age()):
+            raise cls.DoesNotExist
+        return OneTimeToken(user)
 
     @staticmethod
     def check_user(user_id):
         """Try to get user"""
         return User.objects.get(id=user_id)
 
+    @staticmethod
+    def stamp(user):
+        return salted_hmac(settings.ONE_TIME_TOKEN_SALT, user.password).hexdigest()[:12]
+
+    @staticmethod
+    def used_key(key):
+        return f'one-time-token-used:{hashlib.sha256(key.encode()).hexdigest()}'
+
     @property
     def key(self):
         return signing.dumps(
-            obj=self.user.id,
+            obj=[self.user.id, self.stamp(self.user)],
             salt=settings.ONE_TIME_TOKEN_SALT)
@@ -1,8 +1,16 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 
 import graphene
+import graphql_jwt
 from graphene_django import DjangoObjectType
+from graphql import GraphQLError
+from graphql_jwt.exceptions import GraphQLJWTError
 
+from website.core.loaders import load_related
+from website.core.optimizer import optimize
+from website.core.pagination import connection_from_queryset
+from website.users.hashers import HashingBusy, hashing_slot
 
 User = get_user_model()
 
@@ -11,10 +19,29 @@ class UserType(DjangoObjectType):
     class Meta:
         model = User
 
+    def resolve_link_set(self, info, **kwargs):
+        return load_related(info, self, 'link_set')
+
+    def resolve_vote_set(self, info, **kwargs):
+        return load_related(info, self, 'vote_set')
+
+
+class UserConnection(graphene.relay.Connection):
+    class Meta:
+        node = UserType
+
 
 class Query(graphene.ObjectType):
     me    = graphene.Field(UserType)
     users = graphene.List(UserType)
+    users_connection = graphene.Field(
+        UserConnection,
+        first=graphene.Int(),
+        after=graphene.String(),
+        joined_after=graphene.DateTime(),
+        joined_before=graphene.DateTime(),
+        is_active=graphene.Boolean(),
+    )
 
     def resolve_me(self, info, **kwargs):
         user = info.context.user
@@ -24,7 +51,20 @@ class Query(graphene.ObjectType):
         return user
 
     def resolve_users(self, info, **kwargs):
-        return User.objects.all()
+        return optimize(User.objects.order_by('id'), info)[:settings.GRAPHQL_MAX_LIST_SIZE]
+
+    def resolve_users_connection(self, info, first=None, after=None, joined_after=None, joined_before=None,
+                                 is_active=None, **kwargs):
+        queryset = optimize(User.objects.all(), info, fields=['date_joined'])
+
+        if joined_after is not None:
+            queryset = queryset.filter(date_joined__gte=joined_after)
+        if joined_before is not None:
+            queryset = queryset.filter(date_joined__lt=joined_before)
+        if is_active is not None:
+            queryset = queryset.filter(is_active=is_active)
+
+        return connection_from_queryset(UserConnection, queryset, ('-date_joined', '-id'), first, after)
 
 
 class CreateUser(graphene.Mutation):
@@ -40,11 +80,29 @@ class CreateUser(graphene.Mutation):
             username=username,
             email=email,
         )
-        user.set_password(password)
+        try:
+            with hashing_slot():
+                user.set_password(password)
+        except HashingBusy as error:
+            raise GraphQLError(str(error))
         user.save()
 
         return CreateUser(user=user)
 
 
+class ObtainJSONWebToken(graphql_jwt.ObtainJSONWebToken):
+    """Asks the client to retry when the password could not be checked yet, instead of rejecting the credentials."""
+
+    @classmethod
+    def mutate(cls, root, info, **kwargs):
+        try:
+            return super().mutate(root, info, **kwargs)
+        except GraphQLJWTError:
+            busy = getattr(info.context, '_hashing_busy', None)
+            if busy is not None:
+                raise GraphQLError(str(busy))
+            raise
+
+
 class Mutation(graphene.ObjectType):
     create_user = CreateUser.Field()
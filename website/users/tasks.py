@@ -1,7 +1,12 @@
+from smtplib import SMTPException
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.mail import get_connection
+from django.utils.translation import gettext as _
 
 from config import celery_app
-from website.core.utils   import full_url, render_email
+from website.core.utils   import full_urls, render_email
 from website.users.models import OneTimeToken
 
 
@@ -14,22 +19,50 @@ def get_users_count():
     return User.objects.count()
 
 
+@celery_app.task()
 def send_password_email(email):
     """Sends an email to the user"""
-    if User.objects.filter(email__exact=email['email']).exists():
-        user = User.objects.get(email__exact=email['email'])
-        query_dict = {'token': OneTimeToken(user).key}
-        url = full_url('/password/', query_dict=query_dict)
-        context = {
-            'url': url
-        }
-        subject = _('website: New password')
-        template_prefix = 'users/emails/new_user_password'
-        msg = render_email(subject, template_prefix, email['email'], context)
-        msg.send()
-    else:
-        subject = _('website: No Account')
-        template_prefix = 'users/emails/no_account'
-        msg = render_email(subject, template_prefix, email['email'], None)
-        msg.send()
-    return None
+    return send_password_email_batch([email])
+
+
+@celery_app.task()
+def send_password_emails(emails):
+    """
+    Send a link to set a new password to every address of `emails`, or tell it has no account.
+
+    The addresses are split in chunks of EMAIL_BATCH_SIZE, each sent by a
+    `send_password_email_batch` task of its own, so a large mailing neither
+    runs into the time limit of a single task nor starts over when a chunk
+    fails. Returns the number of chunks.
+    """
+    batch_size = settings.EMAIL_BATCH_SIZE
+    batches = [emails[start:start + batch_size] for start in range(0, len(emails), batch_size)]
+    for batch in batches:
+        send_password_email_batch.delay(batch)
+    return len(batches)
+
+
+@celery_app.task(autoretry_for=(SMTPException, OSError), retry_backoff=True, max_retries=3)
+def send_password_email_batch(emails):
+    """Send the emails of `send_password_emails` to a chunk of addresses, with one query and one connection."""
+    with get_connection() as connection:
+        return connection.send_messages(password_messages(emails)) or 0
+
+
+def password_messages(emails):
+    users = {user.email: user for user in User.objects.filter(email__in=emails)}
+    found = [email for email in emails if email in users]
+    urls = full_urls(('/password/', {'token': OneTimeToken(users[email]).key}) for email in found)
+    urls = dict(zip(found, urls))
+
+    messages = []
+    for email in emails:
+        if email in urls:
+            subject = _('website: New password')
+            template_prefix = 'users/emails/new_user_password'
+            messages.append(render_email(subject, template_prefix, email, {'url': urls[email]}))
+        else:
+            subject = _('website: No Account')
+            template_prefix = 'users/emails/no_account'
+            messages.append(render_email(subject, template_prefix, email, None))
+    return messages
@@ -0,0 +1,58 @@
+import pytest
+from django.core.cache import cache
+from django.test import RequestFactory
+
+from graphql_jwt.exceptions import GraphQLJWTError
+from graphql_jwt.shortcuts import get_token
+
+from website.users.backends import CachedJSONWebTokenBackend, local_users
+from website.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    cache.clear()
+    local_users.clear()
+
+
+def token_request(user):
+    return RequestFactory().post('/graphql/', HTTP_AUTHORIZATION=f'JWT {get_token(user)}')
+
+
+def test_user_resolved_from_cache(django_assert_num_queries):
+    user = UserFactory()
+    request = token_request(user)
+    backend = CachedJSONWebTokenBackend()
+
+    assert backend.authenticate(request=request) == user
+
+    local_users.clear()
+    with django_assert_num_queries(0):
+        assert backend.authenticate(request=request) == user
+
+
+def test_deactivated_user_is_rejected():
+    user = UserFactory()
+    request = token_request(user)
+    backend = CachedJSONWebTokenBackend()
+    assert backend.authenticate(request=request) == user
+
+    user.is_active = False
+    user.save()
+
+    with pytest.raises(GraphQLJWTError):
+        backend.authenticate(request=request)
+
+
+def test_saving_a_user_keeps_the_others_cached():
+    user, other = UserFactory.create_batch(2)
+    backend = CachedJSONWebTokenBackend()
+    backend.authenticate(request=token_request(user))
+    backend.authenticate(request=token_request(other))
+
+    user.save()
+
+    assert user.get_username() not in local_users
+    assert other.get_username() in local_users
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+from django.contrib.auth.hashers import Argon2PasswordHasher
+from django.core.cache import cache
+
+from website.users.hashers import CalibratedArgon2PasswordHasher, HashingBusy, hashing_slot
+
+
+def test_calibrated_hasher_upgrades_old_hashes(settings, tmpdir):
+    profile = tmpdir.join('password_hasher.json')
+    profile.write(json.dumps({'time_cost': 1, 'memory_cost': 8 * 1024, 'parallelism': 1}))
+    settings.PASSWORD_HASHER_PROFILE = str(profile)
+    hasher = CalibratedArgon2PasswordHasher()
+
+    old = Argon2PasswordHasher().encode('secret', hasher.salt())
+    assert hasher.verify('secret', old)
+    assert hasher.must_update(old)
+    assert not hasher.must_update(hasher.encode('secret', hasher.salt()))
+
+
+def test_hashing_slots_are_bounded(settings):
+    settings.PASSWORD_HASHING_CONCURRENCY = 1
+    cache.clear()
+
+    with hashing_slot():
+        with pytest.raises(HashingBusy):
+            with hashing_slot():
+                pass
+
+    with hashing_slot():
+        pass
+
+
+def test_expired_hashing_slot_is_not_released_by_its_old_holder(settings):
+    settings.PASSWORD_HASHING_CONCURRENCY = 1
+    cache.clear()
+
+    with hashing_slot():
+        # The slot expired and another worker claimed it.
+        cache.set('password-hashing-slot:0', 'another worker')
+
+    with pytest.raises(HashingBusy):
+        with hashing_slot():
+            pass
+
+
+def test_hashing_slots_fail_open_when_the_cache_is_down(settings, monkeypatch):
+    settings.PASSWORD_HASHING_CONCURRENCY = 1
+    # django_redis with IGNORE_EXCEPTIONS returns None when Redis can't be reached.
+    monkeypatch.setattr(cache, 'add', lambda *args, **kwargs: None)
+
+    with hashing_slot():
+        with hashing_slot():
+            pass
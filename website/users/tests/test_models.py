@@ -1,8 +1,36 @@
 import pytest
-from django.conf import settings
+
+from website.users.models import OneTimeToken
+from website.users.tests.factories import UserFactory
 
 pytestmark = pytest.mark.django_db
 
 
-def test_user_get_absolute_url(user: settings.AUTH_USER_MODEL):
+def test_user_get_absolute_url():
+    user = UserFactory()
     assert user.get_absolute_url() == f"/users/{user.username}/"
+
+
+def test_one_time_token_is_single_use():
+    user = UserFactory()
+    key = OneTimeToken(user).key
+
+    assert OneTimeToken.from_key(key).user == user
+    with pytest.raises(OneTimeToken.DoesNotExist):
+        OneTimeToken.from_key(key)
+
+
+def test_one_time_token_rejected_without_query(django_assert_num_queries):
+    with django_assert_num_queries(0):
+        with pytest.raises(OneTimeToken.DoesNotExist):
+            OneTimeToken.from_key('forged:token')
+
+
+def test_one_time_token_invalid_after_password_change():
+    user = UserFactory()
+    key = OneTimeToken(user).key
+    user.set_password('a new password')
+    user.save()
+
+    with pytest.raises(OneTimeToken.DoesNotExist):
+        OneTimeToken.from_key(key)
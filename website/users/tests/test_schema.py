@@ -0,0 +1,89 @@
+import pytest
+from django.test import RequestFactory
+
+from config.schema import schema
+from website.links.models import Link, Vote
+from website.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def test_users_connection_filters_and_pages():
+    users = UserFactory.create_batch(3)
+    UserFactory(is_active=False)
+    request = RequestFactory().post('/graphql/')
+    request.user = users[0]
+    query = '''
+        query ($after: String) {
+            usersConnection(first: 2, after: $after, isActive: true) {
+                edges { node { id } }
+                pageInfo { endCursor hasNextPage }
+            }
+        }
+    '''
+
+    first_page = schema.execute(query, context_value=request).data['usersConnection']
+    assert first_page['pageInfo']['hasNextPage']
+
+    after = first_page['pageInfo']['endCursor']
+    second_page = schema.execute(query, context_value=request, variable_values={'after': after}).data['usersConnection']
+    assert not second_page['pageInfo']['hasNextPage']
+
+    ids = [int(edge['node']['id']) for page in (first_page, second_page) for edge in page['edges']]
+    assert sorted(ids) == sorted(user.id for user in users)
+
+
+def test_create_user_reports_busy_hashing(settings):
+    settings.PASSWORD_HASHING_CONCURRENCY = 0
+    request = RequestFactory().post('/graphql/')
+
+    result = schema.execute(
+        'mutation { createUser(username: "new", password: "secret", email: "new@example.com") { user { id } } }',
+        context_value=request,
+    )
+
+    assert [error.message for error in result.errors] == ['Too many passwords are being hashed, try again later!']
+
+
+def test_token_auth_reports_busy_hashing(settings):
+    settings.PASSWORD_HASHING_CONCURRENCY = 0
+    user = UserFactory()
+    request = RequestFactory().post('/graphql/')
+
+    result = schema.execute(
+        'mutation ($email: String!) { tokenAuth(email: $email, password: "password") { token } }',
+        context_value=request, variable_values={'email': user.email},
+    )
+
+    assert [error.message for error in result.errors] == ['Too many passwords are being hashed, try again later!']
+
+
+def test_users_vote_set_is_prefetched(django_assert_num_queries):
+    users = UserFactory.create_batch(2)
+    for user in users:
+        Vote.objects.create(user=user, link=Link.objects.create(url=f'https://example.com/{user.id}'))
+    request = RequestFactory().post('/graphql/')
+    request.user = users[0]
+
+    # The users, then their votes in one prefetch query, and no query per user.
+    with django_assert_num_queries(2):
+        result = schema.execute('{ users { voteSet { id } } }', context_value=request)
+
+    assert not result.errors
+    assert sorted(len(user['voteSet']) for user in result.data['users']) == [1, 1]
+
+
+def test_users_vote_set_is_capped(settings):
+    settings.GRAPHQL_MAX_LIST_SIZE = 2
+    user = UserFactory()
+    links = [Link.objects.create(url=f'https://example.com/{i}') for i in range(3)]
+    votes = [Vote.objects.create(user=user, link=link) for link in links]
+    request = RequestFactory().post('/graphql/')
+    request.user = user
+
+    prefetched = schema.execute('{ users { voteSet { id } } }', context_value=request)
+    loaded = schema.execute('{ me { voteSet { id } } }', context_value=request)
+
+    expected = [{'id': str(vote.id)} for vote in votes[:2]]
+    assert prefetched.data['users'] == [{'voteSet': expected}]
+    assert loaded.data['me'] == {'voteSet': expected}
@@ -2,7 +2,7 @@ import pytest
 from celery.result import EagerResult
 
 
-from website.users.tasks import get_users_count
+from website.users.tasks import get_users_count, send_password_emails
 from website.users.tests.factories import UserFactory
 
 
@@ -14,3 +14,16 @@ def test_user_count(settings):
     task_result = get_users_count.delay()
     assert isinstance(task_result, EagerResult)
     assert task_result.result == 3
+
+
+@pytest.mark.django_db
+def test_send_password_emails(settings, mailoutbox):
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+    settings.EMAIL_BATCH_SIZE = 2
+    users = UserFactory.create_batch(2)
+
+    assert send_password_emails([users[0].email, 'nobody@example.com', users[1].email]) == 2
+
+    assert [message.to for message in mailoutbox] == [[users[0].email], ['nobody@example.com'], [users[1].email]]
+    assert '/password/?token=' in mailoutbox[0].body
+    assert '/password/' not in mailoutbox[1].body